@@ -0,0 +1 @@
+"""Benchmarks y pruebas de carga ejecutables con `python -m benchmarks.<módulo>`"""
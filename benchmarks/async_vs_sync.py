@@ -0,0 +1,204 @@
+"""Comparación del modo síncrono (WSGI con hilos) y el asíncrono (src/asgi.py).
+
+Para cada modo siembra la base de datos como benchmarks/load.py, levanta el
+servidor en un proceso aparte y lanza con muchos clientes concurrentes altas
+completas y lecturas de /api/users. El servidor síncrono atiende con un
+número fijo de hilos (como un worker gthread de gunicorn) y el asíncrono con
+uvicorn en un único bucle de eventos; ambos con el mismo tamaño de pool. Con
+--simulated-rtt-ms cada sentencia SQL espera ese tiempo (time.sleep en modo
+síncrono, asyncio.sleep en asíncrono) para imitar un PostgreSQL remoto.
+
+    python -m benchmarks.async_vs_sync --concurrency 64 --threads 8 \\
+        --pool-size 20 --simulated-rtt-ms 5 --output async_vs_sync.json
+
+Necesita uvicorn y el driver asyncio del motor (aiosqlite o asyncpg):
+pip install -r requirements-server.txt.
+"""
+import argparse
+import json
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.engine import make_url
+from werkzeug.serving import BaseWSGIServer
+
+from benchmarks.common import database_url, make_app
+from benchmarks.load import (
+    ADMIN_PHONE,
+    Client,
+    add_signup_invitations,
+    git_revision,
+    read_flow,
+    run_phase,
+    seed,
+    signup_flow,
+    summarize,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ('sync', 'async')
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Servidor WSGI con un número fijo de hilos, como un worker gthread"""
+
+    def __init__(self, host, port, app, threads):
+        super().__init__(host, port, app)
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+def server_config(url, pool_size):
+    return {
+        'SQLALCHEMY_DATABASE_URI': url,
+        'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': pool_size, 'max_overflow': 0, 'pool_timeout': 30},
+        'RATELIMIT_ENABLED': False,
+        'SECRET_KEY': secrets.token_hex(32),
+        'SMS_PROVIDER': 'file',
+        'SMS_SINK_PATH': os.path.join(tempfile.mkdtemp(), 'sms.jsonl')
+    }
+
+def serve(mode, port, url, pool_size, threads, rtt_ms):
+    """Proceso hijo: sirve la aplicación en `port` hasta que lo terminen"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    rtt = rtt_ms / 1000
+    config = server_config(url, pool_size)
+
+    if mode == 'sync':
+        from src.main import create_app
+        if rtt:
+            event.listen(Engine, 'before_cursor_execute', lambda *args: time.sleep(rtt))
+        PooledWSGIServer('127.0.0.1', port, create_app(config), threads).serve_forever()
+        return
+
+    import asyncio
+    import uvicorn
+    from sqlalchemy.util import await_only
+    from src.asgi import create_asgi_app
+    if rtt:
+        # Las sentencias se ejecutan en el greenlet de la petición: la espera cede el bucle
+        event.listen(Engine, 'before_cursor_execute', lambda *args: await_only(asyncio.sleep(rtt)))
+    uvicorn.run(create_asgi_app(config), host='127.0.0.1', port=port, log_level='warning')
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_until_ready(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'el servidor terminó con código {process.returncode}')
+        try:
+            with urllib.request.urlopen(base_url + '/api/metrics', timeout=1):
+                return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.1)
+    raise RuntimeError('el servidor no arrancó a tiempo')
+
+def run_mode(mode, args):
+    url = database_url(f'async_vs_sync_{mode}')
+    app = make_app(f'async_vs_sync_{mode}', SQLALCHEMY_DATABASE_URI=url)
+    seed(app, args.users, args.fanout)
+    add_signup_invitations(app, args.signups)
+
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, '-m', 'benchmarks.async_vs_sync',
+        '--serve', mode, '--port', str(port), '--database-url', url,
+        '--pool-size', str(args.pool_size), '--threads', str(args.threads),
+        '--simulated-rtt-ms', str(args.simulated_rtt_ms)
+    ], cwd=ROOT)
+    base_url = f'http://127.0.0.1:{port}'
+
+    try:
+        wait_until_ready(base_url, process)
+        _, body = Client(base_url, {}).request('login', 'POST', '/api/login', {'phone_number': ADMIN_PHONE})
+        token = body['access_token']
+
+        signup_samples, signup_seconds = run_phase(
+            base_url, args.concurrency,
+            [lambda client, i=i: signup_flow(client, i) for i in range(args.signups)]
+        )
+        read_samples, read_seconds = run_phase(
+            base_url, args.concurrency,
+            [lambda client, i=i: read_flow(client, i, token, args.users, args.page_size)
+             for i in range(args.reads)]
+        )
+    finally:
+        process.terminate()
+        process.wait()
+
+    return {
+        'signup': {
+            'seconds': round(signup_seconds, 2),
+            'flows_per_second': round(args.signups / signup_seconds, 1) if signup_seconds else None,
+            'endpoints': summarize(signup_samples, signup_seconds)
+        },
+        'reads': {
+            'seconds': round(read_seconds, 2),
+            'requests_per_second': round(2 * args.reads / read_seconds, 1) if read_seconds else None,
+            'endpoints': summarize(read_samples, read_seconds)
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--fanout', type=int, default=5)
+    parser.add_argument('--signups', type=int, default=200)
+    parser.add_argument('--reads', type=int, default=2000)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=8, help='Hilos del servidor síncrono')
+    parser.add_argument('--pool-size', type=int, default=20)
+    parser.add_argument('--simulated-rtt-ms', type=float, default=0.0)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--output')
+    # Uso interno: proceso hijo que sirve la aplicación
+    parser.add_argument('--serve', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--database-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.database_url, args.pool_size, args.threads, args.simulated_rtt_ms)
+        return
+
+    url = make_url(database_url('async_vs_sync'))
+
+    report = {
+        'revision': git_revision(),
+        'database': url.get_backend_name(),
+        'config': {name: value for name, value in vars(args).items()
+                   if name not in ('serve', 'port', 'database_url')},
+        'modes': {mode: run_mode(mode, args) for mode in args.modes}
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as target:
+            target.write(output + '\n')
+    print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+import os
+import secrets
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.engine import make_url
+from src.main import create_app
+from src.models.user import db
+
+LOCAL_HOSTS = (None, '', 'localhost', '127.0.0.1', '::1')
+
+def database_url(name):
+    """DATABASE_URL si está definida; si no, una base SQLite temporal.
+
+    Las pruebas insertan y borran datos, así que una DATABASE_URL que no sea
+    SQLite ni un servidor local termina el proceso antes de conectar.
+    """
+    url = os.environ.get('DATABASE_URL')
+    if not url:
+        return 'sqlite:///' + os.path.join(tempfile.mkdtemp(), f'{name}.db')
+    parsed = make_url(url)
+    if parsed.get_backend_name() != 'sqlite' and parsed.host not in LOCAL_HOSTS:
+        sys.exit('Las pruebas escriben y borran datos: DATABASE_URL debe ser SQLite o un servidor local')
+    return url
+
+def make_app(name, **config):
+    """Crea la app contra una base local, con el esquema creado y sin límites de peticiones"""
+    config.setdefault('SQLALCHEMY_DATABASE_URI', database_url(name))
+    config.setdefault('RATELIMIT_ENABLED', False)
+    config.setdefault('SECRET_KEY', os.environ.get('SECRET_KEY') or secrets.token_hex(32))
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+    return app
@@ -0,0 +1,264 @@
+"""Prueba de carga reproducible de los endpoints /api.
+
+Levanta la aplicación (create_app de src/main.py) en un servidor HTTP local
+contra SQLite temporal, o contra el PostgreSQL local de DATABASE_URL. Siembra
+usuarios, un árbol de invitaciones y códigos de verificación con inserciones
+masivas. Después lanza con un pool de clientes concurrentes altas completas
+(check-invitation -> send-verification -> verify-code -> login) y lecturas de
+/api/users. El informe JSON (rendimiento y p50/p95/p99 por endpoint) permite
+comparar commits.
+
+    python -m benchmarks.load --users 10000 --signups 500 --reads 2000 \\
+        --concurrency 16 --output bench_output.json
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.engine import make_url
+from werkzeug.serving import make_server
+
+from benchmarks.common import make_app
+from src.models.user import Invitation, User, VerificationCode, db
+from src.services.bulk import sync_id_sequence
+from src.services.invitation_tree import rebuild_tree
+
+SEED_PHONE_BASE = 600000000
+SIGNUP_PHONE_BASE = 700000000
+ADMIN_PHONE = f'+34{SEED_PHONE_BASE}'
+
+def seed(app, users, fanout, batch_size=5000):
+    """Inserta en lotes un árbol de `users` usuarios (cada uno invita a `fanout`),
+    una invitación usada por usuario y un código de verificación caducado por usuario"""
+    now = datetime.utcnow()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        for start in range(1, users + 1, batch_size):
+            ids = range(start, min(start + batch_size, users + 1))
+            db.session.execute(insert(User), [
+                {
+                    'id': i,
+                    'phone_number': f'+34{SEED_PHONE_BASE + i - 1}',
+                    'is_verified': True,
+                    'is_admin': i == 1,
+                    'created_at': now - timedelta(minutes=users - i),
+                    'invited_by': (i - 2) // fanout + 1 if i > 1 else None,
+                    'invitation_code_used': f'SEED_{i}' if i > 1 else None
+                }
+                for i in ids
+            ])
+            db.session.execute(insert(Invitation), [
+                {
+                    'code': f'SEED_{i}',
+                    'created_by': (i - 2) // fanout + 1,
+                    'used_by': i,
+                    'used_at': now,
+                    'is_active': False
+                }
+                for i in ids if i > 1
+            ])
+            db.session.execute(insert(VerificationCode), [
+                {
+                    'phone_number': f'+34{SEED_PHONE_BASE + i - 1}',
+                    'code': '000000',
+                    'expires_at': now - timedelta(minutes=1),
+                    'is_used': True
+                }
+                for i in ids
+            ])
+        # Los usuarios llevan ids explícitos: las altas de la prueba usan la secuencia
+        sync_id_sequence(User)
+        db.session.commit()
+        rebuild_tree()
+
+def add_signup_invitations(app, signups):
+    if not signups:
+        return
+    with app.app_context():
+        db.session.execute(insert(Invitation), [
+            {'code': f'LOAD_{i}', 'created_by': 1, 'is_active': True}
+            for i in range(signups)
+        ])
+        db.session.commit()
+
+class Client:
+    """Cliente JSON mínimo sobre urllib que registra la latencia por endpoint"""
+
+    def __init__(self, base_url, samples):
+        self.base_url = base_url
+        self.samples = samples
+
+    def request(self, name, method, path, body=None, token=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        req.add_header('Content-Type', 'application/json')
+        if token:
+            req.add_header('Authorization', f'Bearer {token}')
+
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=30) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        elapsed = time.perf_counter() - started
+
+        self.samples.setdefault(name, []).append((elapsed, status))
+        try:
+            return status, json.loads(payload) if payload else None
+        except ValueError:
+            return status, None
+
+def signup_flow(client, i):
+    phone = f'+34{SIGNUP_PHONE_BASE + i}'
+    code = f'LOAD_{i}'
+    client.request('check-invitation', 'POST', '/api/check-invitation', {'invitation_code': code})
+    status, body = client.request('send-verification', 'POST', '/api/send-verification',
+                                  {'phone_number': phone, 'invitation_code': code})
+    if status != 200:
+        return
+    client.request('verify-code', 'POST', '/api/verify-code', {
+        'phone_number': phone,
+        'verification_code': body['verification_code'],
+        'invitation_code': code
+    })
+    client.request('login', 'POST', '/api/login', {'phone_number': phone})
+
+def read_flow(client, i, token, users, page_size):
+    after = (i * page_size) % max(users, 1)
+    client.request('users-page', 'GET', f'/api/users?limit={page_size}&after={after}', token=token)
+    user_id = i % users + 1
+    client.request('user-tree', 'GET', f'/api/users/{user_id}/tree', token=token)
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    # Percentil por rango más cercano
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+def summarize(samples, elapsed):
+    report = {}
+    for name, values in sorted(samples.items()):
+        latencies = sorted(latency for latency, _ in values)
+        report[name] = {
+            'requests': len(values),
+            'errors': len([status for _, status in values if status >= 400]),
+            'throughput_rps': round(len(values) / elapsed, 1) if elapsed else None,
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2)
+        }
+    return report
+
+def run_phase(base_url, concurrency, jobs):
+    """Ejecuta `jobs` (callables que reciben un Client) y devuelve (muestras, segundos)"""
+    local = threading.local()
+    all_samples = []
+    lock = threading.Lock()
+
+    def run(job):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client(base_url, {})
+            with lock:
+                all_samples.append(client.samples)
+        job(client)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run, jobs))
+    elapsed = time.perf_counter() - started
+
+    merged = {}
+    for samples in all_samples:
+        for name, values in samples.items():
+            merged.setdefault(name, []).extend(values)
+    return merged, elapsed
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--fanout', type=int, default=5)
+    parser.add_argument('--signups', type=int, default=500)
+    parser.add_argument('--reads', type=int, default=2000)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    sms_sink = os.path.join(tempfile.mkdtemp(), 'sms.jsonl')
+    app = make_app('load', SMS_PROVIDER='file', SMS_SINK_PATH=sms_sink)
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+
+    seed_started = time.perf_counter()
+    seed(app, args.users, args.fanout)
+    add_signup_invitations(app, args.signups)
+    seed_seconds = time.perf_counter() - seed_started
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    try:
+        admin = Client(base_url, {})
+        _, body = admin.request('login', 'POST', '/api/login', {'phone_number': ADMIN_PHONE})
+        token = body['access_token']
+
+        signup_samples, signup_seconds = run_phase(
+            base_url, args.concurrency,
+            [lambda client, i=i: signup_flow(client, i) for i in range(args.signups)]
+        )
+        read_samples, read_seconds = run_phase(
+            base_url, args.concurrency,
+            [lambda client, i=i: read_flow(client, i, token, args.users, args.page_size)
+             for i in range(args.reads)]
+        )
+    finally:
+        server.shutdown()
+
+    report = {
+        'revision': git_revision(),
+        'database': url.get_backend_name(),
+        'config': vars(args),
+        'seed_seconds': round(seed_seconds, 2),
+        'signup': {
+            'seconds': round(signup_seconds, 2),
+            'flows_per_second': round(args.signups / signup_seconds, 1) if signup_seconds else None,
+            'endpoints': summarize(signup_samples, signup_seconds)
+        },
+        'reads': {
+            'seconds': round(read_seconds, 2),
+            'endpoints': summarize(read_samples, read_seconds)
+        }
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as target:
+            target.write(output + '\n')
+    print(output)
+
+if __name__ == '__main__':
+    main()
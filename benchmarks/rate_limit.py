@@ -0,0 +1,232 @@
+"""Comprobaciones y coste del limitador de peticiones.
+
+Primero comprueba el comportamiento: 429 con Retry-After, relleno de los
+buckets, claves independientes por ámbito, que el desalojo de una stripe
+llena no reinicia buckets de otras reglas ni se repite en cada llamada, que
+X-Forwarded-For falseado no esquiva el límite por IP y el 503 por exceso de
+concurrencia; sale con código 1 si alguna falla. Después mide el tiempo por
+llamada del backend de token buckets (uno y varios hilos) y la sobrecarga
+por petición de @rate_limit sobre /api/check-invitation con la invitación
+ya en caché, es decir, sin acceso a la base de datos.
+
+    python -m benchmarks.rate_limit --calls 100000 --threads 8
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import make_app
+from src.models.user import Invitation, User, db
+from src.services.rate_limit import ConcurrencyLimiter, MemoryRateLimitBackend, parse_rate
+
+app = make_app('rate_limit', RATELIMIT_ENABLED=True)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def seed_invitation():
+    with app.app_context():
+        if not db.session.execute(db.select(Invitation.id)).first():
+            user = User(phone_number='+34600000000', is_verified=True, is_admin=True)
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Invitation(code='BENCH', created_by=user.id))
+            db.session.add(Invitation(code='BENCH2', created_by=user.id))
+            db.session.commit()
+
+def check_invitation(client, code, ip):
+    return client.post(
+        '/api/check-invitation',
+        json={'invitation_code': code},
+        environ_base={'REMOTE_ADDR': ip}
+    )
+
+def check_429_retry_after():
+    # check-invitation admite 10/minute por invitación: la 11.ª desde otra IP se rechaza
+    client = app.test_client()
+    statuses = [check_invitation(client, 'BENCH', f'10.1.0.{i}').status_code for i in range(10)]
+    response = check_invitation(client, 'BENCH', '10.1.0.200')
+    return (
+        statuses == [200] * 10
+        and response.status_code == 429
+        and response.headers.get('Retry-After') == '6'
+    )
+
+def check_per_scope_keys():
+    # Agotar el bucket de BENCH no afecta a BENCH2 desde la misma IP
+    client = app.test_client()
+    for _ in range(12):
+        check_invitation(client, 'BENCH', '10.2.0.1')
+    return check_invitation(client, 'BENCH2', '10.2.0.1').status_code == 200
+
+def check_refill():
+    clock = FakeClock()
+    backend = MemoryRateLimitBackend(clock=clock)
+    rate, capacity = parse_rate('5/hour')
+    allowed = [backend.consume('phone:x', rate, capacity)[0] for _ in range(5)]
+    denied, retry_after = backend.consume('phone:x', rate, capacity)
+    clock.now += retry_after
+    refilled, _ = backend.consume('phone:x', rate, capacity)
+    return all(allowed) and not denied and round(retry_after) == 720 and refilled
+
+def check_eviction_keeps_other_rules():
+    # Una stripe llena de buckets por IP (30/minute) no debe desalojar un bucket
+    # de teléfono (5/hour) vaciado hace un minuto
+    clock = FakeClock()
+    backend = MemoryRateLimitBackend(stripes=1, max_keys_per_stripe=3, clock=clock)
+    phone_rate, phone_capacity = parse_rate('5/hour')
+    ip_rate, ip_capacity = parse_rate('30/minute')
+    for _ in range(5):
+        backend.consume('phone:send:+34600000001', phone_rate, phone_capacity)
+    for i in range(3):
+        backend.consume(f'ip:send:10.3.0.{i}', ip_rate, ip_capacity)
+    clock.now += 61
+    for i in range(3, 7):
+        backend.consume(f'ip:send:10.3.0.{i}', ip_rate, ip_capacity)
+    allowed, _ = backend.consume('phone:send:+34600000001', phone_rate, phone_capacity)
+    return not allowed and len(backend) <= 5
+
+def check_forwarded_for_spoofing():
+    # Detrás de un proxy, cambiar la primera entrada de X-Forwarded-For en cada
+    # petición no reinicia el bucket de la IP (30/minute) que añade el proxy
+    limiter = app.extensions['rate_limiter']
+    previous, limiter.proxy_hops = limiter.proxy_hops, 1
+    client = app.test_client()
+    try:
+        statuses = [
+            client.post(
+                '/api/check-invitation',
+                json={'invitation_code': f'SPOOF{i}'},
+                headers={'X-Forwarded-For': f'198.51.100.{i}, 203.0.113.5'}
+            ).status_code
+            for i in range(31)
+        ]
+    finally:
+        limiter.proxy_hops = previous
+    return 429 not in statuses[:30] and statuses[30] == 429
+
+def check_eviction_throttled():
+    # Con la stripe por encima del límite y nada lleno, el recorrido no se repite en cada consume
+    clock = FakeClock()
+    backend = MemoryRateLimitBackend(stripes=1, max_keys_per_stripe=10, clock=clock)
+    scans = []
+    evict_full = backend._evict_full
+    backend._evict_full = lambda buckets, now: (scans.append(now), evict_full(buckets, now))
+    rate, capacity = parse_rate('30/minute')
+    for i in range(1000):
+        backend.consume(f'ip:flood:{i}', rate, capacity)
+    clock.now += 2
+    backend.consume('ip:flood:last', rate, capacity)
+    return len(scans) == 2 and len(backend) == 1
+
+def check_503_shedding():
+    limiter = app.extensions['rate_limiter']
+    previous, limiter.concurrency = limiter.concurrency, ConcurrencyLimiter(1)
+    try:
+        limiter.concurrency.try_acquire()
+        response = check_invitation(app.test_client(), 'BENCH2', '10.4.0.1')
+        limiter.concurrency.release()
+        after = check_invitation(app.test_client(), 'BENCH2', '10.4.0.2')
+        return (
+            response.status_code == 503
+            and response.headers.get('Retry-After') == '1'
+            and after.status_code == 200
+            and limiter.concurrency.shed == 1
+        )
+    finally:
+        limiter.concurrency = previous
+
+CHECKS = {
+    '429_retry_after': check_429_retry_after,
+    'per_scope_keys': check_per_scope_keys,
+    'refill': check_refill,
+    'eviction_keeps_other_rules': check_eviction_keeps_other_rules,
+    'eviction_throttled': check_eviction_throttled,
+    'forwarded_for_spoofing': check_forwarded_for_spoofing,
+    '503_shedding': check_503_shedding
+}
+
+def backend_overhead(calls, threads):
+    backend = MemoryRateLimitBackend()
+    keys = [f'ip:bench:{i}' for i in range(1000)]
+
+    def work(offset):
+        for i in range(offset, calls, threads):
+            backend.consume(keys[i % len(keys)], 1000.0, 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(work, range(threads)))
+    elapsed = time.perf_counter() - started
+    return round(elapsed / calls * 1e6, 3)
+
+def request_overhead(requests):
+    # Cada petición usa su propia invitación e IP: con una sola invitación
+    # (10/minute) se mediría casi siempre el camino del 429
+    codes = [f'OVERHEAD_{i}' for i in range(requests)]
+    with app.app_context():
+        created_by = db.session.execute(db.select(User.id)).scalar()
+        existing = set(db.session.execute(
+            db.select(Invitation.code).where(Invitation.code.like('OVERHEAD_%'))
+        ).scalars())
+        rows = [{'code': code, 'created_by': created_by} for code in codes if code not in existing]
+        if rows:
+            db.session.execute(db.insert(Invitation), rows)
+            db.session.commit()
+
+    client = app.test_client()
+    limiter = app.extensions['rate_limiter']
+    results = {}
+
+    def run(enabled):
+        limiter.enabled = enabled
+        statuses = []
+        started = time.perf_counter()
+        for i, code in enumerate(codes):
+            statuses.append(client.post(
+                '/api/check-invitation',
+                json={'invitation_code': code},
+                environ_base={'REMOTE_ADDR': f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}'}
+            ).status_code)
+        return time.perf_counter() - started, statuses
+
+    # Calentamiento sin límites: deja todas las invitaciones en la caché
+    run(False)
+    for enabled in (False, True):
+        elapsed, statuses = run(enabled)
+        if set(statuses) != {200}:
+            raise RuntimeError(f'respuestas distintas de 200 con el limitador {"activo" if enabled else "inactivo"}')
+        results['enabled' if enabled else 'disabled'] = elapsed / requests * 1e6
+
+    return {
+        'disabled_us_per_request': round(results['disabled'], 1),
+        'enabled_us_per_request': round(results['enabled'], 1),
+        'overhead_us_per_request': round(results['enabled'] - results['disabled'], 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=100000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    seed_invitation()
+    checks = {name: check() for name, check in CHECKS.items()}
+    report = {
+        'checks': checks,
+        'backend_us_per_call_1_thread': backend_overhead(args.calls, 1),
+        f'backend_us_per_call_{args.threads}_threads': backend_overhead(args.calls, args.threads),
+        'request': request_overhead(args.requests)
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if all(checks.values()) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
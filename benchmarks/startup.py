@@ -0,0 +1,72 @@
+"""Tiempo de arranque de la aplicación con y sin comprobación de esquema.
+
+Cada muestra es un proceso nuevo que importa src.main y llama a create_app,
+con AUTO_CREATE_SCHEMA desactivado (por defecto) y activado. Con
+--simulated-rtt-ms se añade una espera a cada sentencia SQL para imitar una
+base de datos remota.
+
+    python -m benchmarks.startup --runs 10 --simulated-rtt-ms 40
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import database_url
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import secrets, sys, time
+started = time.perf_counter()
+rtt = float(sys.argv[3]) / 1000
+if rtt:
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    event.listen(Engine, 'before_cursor_execute', lambda *args: time.sleep(rtt))
+from src.main import create_app
+app = create_app({
+    'SQLALCHEMY_DATABASE_URI': sys.argv[1],
+    'AUTO_CREATE_SCHEMA': sys.argv[2] == '1',
+    'SECRET_KEY': secrets.token_hex(32),
+})
+print((time.perf_counter() - started) * 1000)
+'''
+
+def sample(url, schema, rtt_ms):
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, url, '1' if schema else '0', str(rtt_ms)],
+        cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def measure(url, schema, runs, rtt_ms):
+    samples = [sample(url, schema, rtt_ms) for _ in range(runs)]
+    return {
+        'mean_ms': round(statistics.mean(samples), 1),
+        'min_ms': round(min(samples), 1),
+        'max_ms': round(max(samples), 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--simulated-rtt-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    url = database_url('startup')
+    # Crear el esquema una vez para que ambas variantes midan solo la comprobación
+    sample(url, True, 0)
+
+    report = {
+        'runs': args.runs,
+        'simulated_rtt_ms': args.simulated_rtt_ms,
+        'without_schema_check': measure(url, False, args.runs, args.simulated_rtt_ms),
+        'with_schema_check': measure(url, True, args.runs, args.simulated_rtt_ms)
+    }
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
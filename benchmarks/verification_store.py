@@ -0,0 +1,94 @@
+"""Micro-benchmark de los almacenes de códigos de verificación.
+
+Ejecuta el mismo escenario de comprobación y de rendimiento (issue + consume)
+contra SqlVerificationStore y MemoryVerificationStore.
+
+    python -m benchmarks.verification_store --codes 5000 --threads 8
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_app
+from src.models.user import db
+from src.services.verification_store import (
+    VERIFICATION_EXPIRED,
+    VERIFICATION_INVALID,
+    VERIFICATION_OK,
+    MemoryVerificationStore,
+    SqlVerificationStore,
+)
+
+app = make_app('verification')
+
+def phone(n):
+    return f'+34{600000000 + n}'
+
+def check_contract(store):
+    """Comportamiento común que debe cumplir cualquier backend"""
+    now = datetime.utcnow()
+    with app.app_context():
+        store.issue(phone(1), '111111', now + timedelta(minutes=10))
+        store.issue(phone(2), '222222', now - timedelta(minutes=1))
+        store.issue(phone(3), '333333', now + timedelta(minutes=10))
+        store.issue(phone(3), '444444', now + timedelta(minutes=10))
+        db.session.commit()
+
+        assert store.consume(phone(1), '000000', now) == VERIFICATION_INVALID
+        assert store.consume(phone(1), '111111', now) == VERIFICATION_OK
+        assert store.consume(phone(1), '111111', now) == VERIFICATION_INVALID
+        assert store.consume(phone(2), '222222', now) == VERIFICATION_EXPIRED
+        assert store.consume(phone(3), '333333', now) == VERIFICATION_INVALID
+        assert store.consume(phone(3), '444444', now) == VERIFICATION_OK
+        db.session.commit()
+
+        store.issue(phone(4), '555555', now - timedelta(minutes=1))
+        db.session.commit()
+        assert store.sweep(now) >= 1
+        assert store.consume(phone(4), '555555', now) == VERIFICATION_INVALID
+        db.session.rollback()
+
+def run_phase(store, operation, codes, threads):
+    expires_at = datetime.utcnow() + timedelta(minutes=10)
+
+    def work(chunk):
+        with app.app_context():
+            for i in chunk:
+                if operation == 'issue':
+                    store.issue(phone(1000 + i), '123456', expires_at)
+                else:
+                    assert store.consume(phone(1000 + i), '123456') == VERIFICATION_OK
+                db.session.commit()
+
+    chunks = [range(t, codes, threads) for t in range(threads)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(work, chunks))
+    elapsed = time.perf_counter() - started
+    return round(codes / elapsed, 1)
+
+def benchmark(store, codes, threads):
+    check_contract(store)
+    return {
+        'issue_per_second': run_phase(store, 'issue', codes, threads),
+        'consume_per_second': run_phase(store, 'consume', codes, threads)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--codes', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    report = {
+        'codes': args.codes,
+        'threads': args.threads,
+        'sql': benchmark(SqlVerificationStore(), args.codes, args.threads),
+        'memory': benchmark(MemoryVerificationStore(), args.codes, args.threads)
+    }
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Prueba de estrés concurrente de /api/verify-code.
+
+Comprueba que una invitación se consume exactamente una vez cuando varios
+hilos compiten por ella y mide las altas por segundo con invitaciones
+independientes. Por defecto usa una base SQLite temporal; DATABASE_URL
+puede apuntar a un PostgreSQL local.
+
+    python -m benchmarks.verify_code_stress --threads 16 --signups 500
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import make_url
+
+from benchmarks.common import make_app
+from src.models.user import Invitation, User, VerificationCode, db
+from src.services.invitation_tree import add_user_to_tree
+
+app = make_app('stress')
+
+PHONE_BASE = 600000000
+
+def phone(n):
+    return f'+34{PHONE_BASE + n}'
+
+def seed(invitations, phones, offset):
+    """Crea el Usuario Cero, las invitaciones y un código vigente por teléfono"""
+    with app.app_context():
+        admin = db.session.execute(select(User.id).where(User.is_admin == True)).scalar()
+        if admin is None:
+            admin_user = User(phone_number=phone(0), is_verified=True, is_admin=True)
+            db.session.add(admin_user)
+            db.session.flush()
+            add_user_to_tree(admin_user.id)
+            admin = admin_user.id
+
+        expires_at = datetime.utcnow() + timedelta(minutes=10)
+        if invitations:
+            db.session.execute(insert(Invitation), [
+                {'code': code, 'created_by': admin, 'is_active': True} for code in invitations
+            ])
+        db.session.execute(insert(VerificationCode), [
+            {'phone_number': phone(offset + i), 'code': '123456', 'expires_at': expires_at}
+            for i in range(phones)
+        ])
+        db.session.commit()
+
+def signup(client_local, phone_number, invitation_code):
+    client = getattr(client_local, 'client', None)
+    if client is None:
+        client = client_local.client = app.test_client()
+    response = client.post('/api/verify-code', json={
+        'phone_number': phone_number,
+        'verification_code': '123456',
+        'invitation_code': invitation_code
+    })
+    return response.status_code
+
+def race(threads):
+    """Todos los hilos intentan consumir la misma invitación a la vez"""
+    code = 'RACE_INVITATION'
+    seed([code], threads, offset=1)
+
+    client_local = threading.local()
+    barrier = threading.Barrier(threads)
+
+    def attempt(i):
+        barrier.wait()
+        return signup(client_local, phone(1 + i), code)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = list(pool.map(attempt, range(threads)))
+
+    with app.app_context():
+        used_by = db.session.execute(
+            select(Invitation.used_by).where(Invitation.code == code)
+        ).scalar()
+        created = db.session.execute(
+            select(func.count(User.id)).where(User.invitation_code_used == code)
+        ).scalar()
+
+    return {
+        'threads': threads,
+        'created': statuses.count(201),
+        'rejected': statuses.count(400),
+        'errors': len([s for s in statuses if s >= 500]),
+        'users_with_code': created,
+        'invitation_used_by_set': used_by is not None,
+        'exactly_once': statuses.count(201) == 1 and created == 1 and used_by is not None
+    }
+
+def throughput(threads, signups):
+    """Altas independientes en paralelo, una invitación por teléfono"""
+    offset = 1000
+    codes = [f'STRESS_{i}' for i in range(signups)]
+    seed(codes, signups, offset=offset)
+
+    client_local = threading.local()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = list(pool.map(
+            lambda i: signup(client_local, phone(offset + i), codes[i]),
+            range(signups)
+        ))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'threads': threads,
+        'signups': signups,
+        'created': statuses.count(201),
+        'errors': len([s for s in statuses if s != 201]),
+        'seconds': round(elapsed, 3),
+        'signups_per_second': round(statuses.count(201) / elapsed, 1) if elapsed else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--signups', type=int, default=500)
+    args = parser.parse_args()
+
+    report = {
+        'database': make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name(),
+        'race': race(args.threads),
+        'throughput': throughput(args.threads, args.signups)
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if report['race']['exactly_once'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Configuración de producción: `gunicorn -c gunicorn.conf.py`.
+
+SERVER_MODE=sync (por defecto) sirve src.main:app con workers de hilos;
+SERVER_MODE=async sirve src.asgi:app con workers de uvicorn y el motor
+asyncio de SQLAlchemy. Cada worker es un proceso con su propio pool de
+conexiones (DB_POOL_SIZE + DB_MAX_OVERFLOW) y sus propias cachés, así que
+el total de conexiones a la base de datos es workers × pool.
+
+Las dependencias de ambos modos están en requirements-server.txt.
+"""
+import multiprocessing
+import os
+from src.config import env_int
+
+mode = os.environ.get('SERVER_MODE', 'sync')
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+workers = env_int(os.environ, 'WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8))
+
+if mode == 'async':
+    wsgi_app = 'src.asgi:app'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+elif mode == 'sync':
+    wsgi_app = 'src.main:app'
+    worker_class = 'gthread'
+    # Cada hilo retiene una conexión mientras espera a la base de datos;
+    # más hilos que conexiones solo añade espera en el pool
+    threads = env_int(os.environ, 'SERVER_THREADS', 8)
+else:
+    raise ValueError(f'SERVER_MODE desconocido: {mode}')
+
+# Detrás de un balanceador, el keep-alive debe superar su tiempo de inactividad
+# (p. ej. 75 s tras uno de 60 s) para que no reutilice conexiones ya cerradas
+keepalive = env_int(os.environ, 'SERVER_KEEPALIVE', 5)
+timeout = env_int(os.environ, 'SERVER_TIMEOUT', 30)
+graceful_timeout = env_int(os.environ, 'SERVER_GRACEFUL_TIMEOUT', 30)
+
+# Reciclar workers acota el crecimiento de memoria de las cachés en proceso
+max_requests = env_int(os.environ, 'SERVER_MAX_REQUESTS', 10000)
+max_requests_jitter = env_int(os.environ, 'SERVER_MAX_REQUESTS_JITTER', 1000)
+
+# Sin preload: el pool de conexiones no debe compartirse entre procesos tras el fork
+preload_app = False
+
+accesslog = os.environ.get('SERVER_ACCESS_LOG') or None
+errorlog = '-'
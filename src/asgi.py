@@ -0,0 +1,225 @@
+"""Modo de servicio asíncrono (ASGI) con acceso no bloqueante a la base de datos.
+
+Sirve la misma aplicación Flask de src/main.py (mismos handlers y mismas
+respuestas) sobre el motor asyncio de SQLAlchemy: aiosqlite para SQLite y
+asyncpg para PostgreSQL. Cada petición se ejecuta en un greenlet dentro del
+bucle de eventos; cuando un handler espera a la base de datos, el greenlet
+cede el control y el proceso sigue atendiendo otras peticiones, así que la
+concurrencia por proceso depende del pool de conexiones y no del número de
+hilos.
+
+    pip install -r requirements-server.txt
+    uvicorn src.asgi:app --workers 4 --timeout-keep-alive 5
+    SERVER_MODE=async gunicorn -c gunicorn.conf.py
+
+El trabajo de CPU de un handler sigue bloqueando el bucle mientras dura; los
+handlers de /api hacen poco más que esperar a la base de datos.
+"""
+import os
+import sys
+# Igual que src/main.py: permite `python src/asgi.py` además de `-m`
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import asyncio
+import io
+from sqlalchemy.util import await_only, greenlet_spawn
+from src.config import async_database_url, config_from_env
+from src.main import create_app, warm_up_pool
+from src.models.user import db
+from src.services.schema import upgrade_schema
+from src.services.verification_store import get_verification_store
+
+def build_environ(scope, body):
+    """Traduce un scope HTTP de ASGI al environ de WSGI (PEP 3333)"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        # El cuerpo ya se ha leído entero: sin Content-Length (chunked) también se lee
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        environ[name] = f'{environ[name]},{value}' if name in environ else value
+    return environ
+
+async def read_body(receive):
+    """Lee el cuerpo completo de la petición; None si el cliente se desconecta"""
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        body += message.get('body', b'')
+        if not message.get('more_body', False):
+            return bytes(body)
+
+class AsyncApp:
+    """Aplicación ASGI que ejecuta la app WSGI de Flask dentro de greenlets.
+
+    Las operaciones del motor asyncio se esperan con `await_only` desde el
+    código síncrono de los handlers; el envío de la respuesta también, de
+    modo que las respuestas en streaming (NDJSON) no se acumulan en memoria.
+    """
+
+    def __init__(self, flask_app, create_schema=False, pool_warmup=0, sweep_interval=0):
+        self.flask_app = flask_app
+        self.create_schema = create_schema
+        self.pool_warmup = pool_warmup
+        self.sweep_interval = sweep_interval
+        self._sweeper = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self.handle_http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self.handle_lifespan(receive, send)
+        else:
+            raise RuntimeError(f"Tipo de conexión no soportado: {scope['type']}")
+
+    async def handle_http(self, scope, receive, send):
+        body = await read_body(receive)
+        if body is None:
+            return
+        await greenlet_spawn(self.run_wsgi, build_environ(scope, body), send)
+
+    def run_wsgi(self, environ, send):
+        """Ejecuta la petición en el greenlet y envía la respuesta a medida que se genera"""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['start'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [
+                    (name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers
+                ]
+            }
+
+        iterable = self.flask_app.wsgi_app(environ, start_response)
+        try:
+            started = False
+            for chunk in iterable:
+                if not chunk:
+                    continue
+                if not started:
+                    await_only(send(response['start']))
+                    started = True
+                await_only(send({'type': 'http.response.body', 'body': chunk, 'more_body': True}))
+            if not started:
+                await_only(send(response['start']))
+            await_only(send({'type': 'http.response.body', 'body': b''}))
+        finally:
+            # Cierra el contexto de la petición (y devuelve la conexión al pool)
+            if hasattr(iterable, 'close'):
+                iterable.close()
+
+    async def handle_lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await greenlet_spawn(self.startup)
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                if self.sweep_interval:
+                    self._sweeper = asyncio.create_task(self.sweep_periodically())
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._sweeper:
+                    self._sweeper.cancel()
+                await greenlet_spawn(self.shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def startup(self):
+        with self.flask_app.app_context():
+            if self.create_schema:
+                upgrade_schema()
+            if self.pool_warmup:
+                warm_up_pool(self.pool_warmup)
+
+    def shutdown(self):
+        # La cola de SMS se vacía en atexit, como en el modo WSGI
+        with self.flask_app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+
+    def sweep(self):
+        with self.flask_app.app_context():
+            get_verification_store().sweep()
+
+    async def sweep_periodically(self):
+        """Purga de códigos en el propio bucle: las conexiones asyncio no salen de él"""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await greenlet_spawn(self.sweep)
+            except Exception:
+                self.flask_app.logger.exception('Error al purgar códigos de verificación')
+
+def create_asgi_app(config=None):
+    """Crea la app ASGI; `config` sobrescribe la configuración leída del entorno.
+
+    La URL de la base de datos se pasa a su driver asyncio. Todo acceso a la
+    base de datos debe ocurrir dentro de un greenlet, así que el esquema, el
+    precalentamiento del pool y la purga periódica se hacen en el lifespan
+    en lugar de en create_app.
+    """
+    settings = config_from_env()
+    settings.update(config or {})
+
+    flask_app = create_app(dict(
+        config or {},
+        SQLALCHEMY_DATABASE_URI=async_database_url(settings['SQLALCHEMY_DATABASE_URI']),
+        AUTO_CREATE_SCHEMA=False,
+        DB_POOL_WARMUP=0,
+        VERIFICATION_SWEEP_INTERVAL=0
+    ))
+    return AsyncApp(
+        flask_app,
+        create_schema=settings['AUTO_CREATE_SCHEMA'],
+        pool_warmup=settings['DB_POOL_WARMUP'],
+        sweep_interval=settings['VERIFICATION_SWEEP_INTERVAL']
+    )
+
+_app = None
+
+def __getattr__(name):
+    # `uvicorn src.asgi:app` crea la app al primer acceso, como src.main
+    global _app
+    if name == 'app':
+        if _app is None:
+            _app = create_asgi_app()
+        return _app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(
+        'src.asgi:app',
+        host='0.0.0.0',
+        port=int(os.environ.get('PORT', 5000)),
+        workers=int(os.environ.get('WEB_CONCURRENCY', 1)),
+        timeout_keep_alive=int(os.environ.get('SERVER_KEEPALIVE', 5))
+    )
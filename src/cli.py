@@ -0,0 +1,141 @@
+import click
+import sys
+from datetime import datetime
+from src.models.user import db, User, Invitation
+from src.services.data_transfer import TABLES, export_table, format_from_path, import_table
+from src.services.invitation_tree import add_user_to_tree, rebuild_tree
+from src.services.invitations import issue_invitations
+from src.services.schema import upgrade_schema
+from src.services.static_assets import init_static_assets, write_precompressed
+from src.services.stats import backfill_stats, record_invitations_issued
+from src.services.verification_store import get_verification_store
+
+ADMIN_PHONE_NUMBER = '+34670709259'
+INITIAL_INVITATION_CODE = 'MI_PRIMERA_INVITACION'
+
+def seed_database():
+    """Crea el Usuario Cero y la invitación inicial si no existen"""
+    # Verificar si el Usuario Cero ya existe
+    admin_user = User.query.filter_by(phone_number=ADMIN_PHONE_NUMBER).first()
+
+    if not admin_user:
+        # Crear Usuario Cero (admin)
+        admin_user = User(
+            phone_number=ADMIN_PHONE_NUMBER,
+            is_verified=True,
+            is_admin=True
+        )
+        db.session.add(admin_user)
+        db.session.flush()
+        # El Usuario Cero es la raíz del árbol de invitaciones
+        add_user_to_tree(admin_user.id)
+        db.session.commit()
+        click.echo("Usuario Cero creado exitosamente")
+    else:
+        click.echo("Usuario Cero ya existe")
+
+    # Verificar si la invitación inicial ya existe
+    initial_invitation = Invitation.query.filter_by(code=INITIAL_INVITATION_CODE).first()
+
+    if not initial_invitation:
+        # Crear invitación inicial
+        initial_invitation = Invitation(
+            code=INITIAL_INVITATION_CODE,
+            created_by=admin_user.id,
+            is_active=True
+        )
+        db.session.add(initial_invitation)
+        record_invitations_issued(admin_user.id, 1, datetime.utcnow())
+        db.session.commit()
+        click.echo("Invitación inicial creada exitosamente")
+    else:
+        click.echo("Invitación inicial ya existe")
+
+def register_commands(app):
+    """Registra los comandos de mantenimiento en `flask --app src.main`"""
+
+    @app.cli.command('create-db')
+    def create_db_command():
+        """Crea las tablas que falten y añade columnas e índices nuevos a las existentes (paso de despliegue)"""
+        created = upgrade_schema()
+        click.echo(f"Esquema actualizado; columnas e índices creados: {', '.join(created) or 'ninguno'}")
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Crea o actualiza el esquema y los datos iniciales (Usuario Cero e invitación)"""
+        upgrade_schema()
+        seed_database()
+        click.echo("Base de datos inicializada correctamente")
+
+    @app.cli.command('rebuild-invitation-tree')
+    def rebuild_invitation_tree_command():
+        """Reconstruye la tabla de cierre del árbol de invitaciones"""
+        total = rebuild_tree()
+        click.echo(f'Árbol de invitaciones reconstruido: {total} filas')
+
+    @app.cli.command('sweep-verification-codes')
+    def sweep_verification_codes_command():
+        """Elimina los códigos de verificación caducados o ya usados"""
+        removed = get_verification_store().sweep()
+        click.echo(f'Códigos de verificación eliminados: {removed}')
+
+    @app.cli.command('build-static')
+    def build_static_command():
+        """Genera las variantes .gz/.br de los ficheros estáticos comprimibles"""
+        written = write_precompressed(app.static_folder)
+        manifest = init_static_assets(app)
+        click.echo(f'Variantes comprimidas generadas: {written} ({len(manifest)} ficheros en el manifiesto)')
+
+    @app.cli.command('issue-invitations')
+    @click.option('--created-by', type=int, required=True, help='Id del usuario que emite las invitaciones')
+    @click.option('--count', type=int, required=True, help='Número de invitaciones')
+    @click.option('--batch-size', type=int, default=1000, show_default=True)
+    def issue_invitations_command(created_by, count, batch_size):
+        """Emite invitaciones en bloque e imprime un código por línea"""
+        if db.session.get(User, created_by) is None:
+            raise click.BadParameter(f'no existe el usuario {created_by}', param_hint='--created-by')
+        codes = issue_invitations(created_by, count, batch_size=batch_size)
+        db.session.commit()
+        for code in codes:
+            click.echo(code)
+
+    @app.cli.command('export-data')
+    @click.argument('table', type=click.Choice(sorted(TABLES)))
+    @click.option('--output', '-o', default='-', help='Fichero .csv o .jsonl (por defecto, salida estándar)')
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None)
+    def export_data_command(table, output, fmt):
+        """Exporta usuarios o invitaciones en CSV/JSONL con memoria constante"""
+        fmt = fmt or format_from_path(output)
+        if output == '-':
+            count = export_table(table, sys.stdout, fmt)
+        else:
+            with open(output, 'w', encoding='utf-8', newline='') as out:
+                count = export_table(table, out, fmt)
+        click.echo(f'{count} filas exportadas', err=True)
+
+    @app.cli.command('import-data')
+    @click.argument('table', type=click.Choice(sorted(TABLES)))
+    @click.argument('source', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None)
+    @click.option('--chunk-size', type=int, default=1000, show_default=True)
+    def import_data_command(table, source, fmt, chunk_size):
+        """Importa usuarios o invitaciones con upserts por lotes (phone_number / code)"""
+        with open(source, encoding='utf-8', newline='') as data:
+            count = import_table(table, data, fmt or format_from_path(source), chunk_size=chunk_size)
+        click.echo(f'{count} filas importadas')
+        if table == 'users':
+            total = rebuild_tree()
+            click.echo(f'Árbol de invitaciones reconstruido: {total} filas')
+        # Las estadísticas no se recalculan aquí: backfill-stats reconstruye
+        # codes_sent desde verification_codes, que la purga va vaciando
+        click.echo('Las estadísticas no incluyen las filas importadas; ejecuta backfill-stats si las necesitas', err=True)
+
+    @app.cli.command('backfill-stats')
+    def backfill_stats_command():
+        """Recalcula las estadísticas diarias y por creador desde las tablas base.
+
+        Con pérdida en los contadores de códigos: codes_sent y codes_verified
+        solo cuentan los códigos que la purga aún no ha borrado y las altas.
+        """
+        days, creators = backfill_stats()
+        click.echo(f'Estadísticas recalculadas: {days} días, {creators} creadores')
@@ -0,0 +1,109 @@
+import os
+from sqlalchemy.engine import make_url
+
+DEFAULT_DATABASE_URL = 'sqlite:///' + os.path.join(os.path.dirname(__file__), 'database', 'confianza.db')
+
+def env_bool(environ, name, default):
+    value = environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes')
+
+def env_int(environ, name, default):
+    value = environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+def env_float(environ, name, default):
+    value = environ.get(name)
+    return float(value) if value not in (None, '') else default
+
+def config_from_env(environ=None):
+    """Lee la configuración de la aplicación de las variables de entorno"""
+    environ = os.environ if environ is None else environ
+    return {
+        # Obligatoria fuera de DEBUG/TESTING: firma los tokens de acceso (ver init_token_service)
+        'SECRET_KEY': environ.get('SECRET_KEY') or None,
+        'SQLALCHEMY_DATABASE_URI': environ.get('DATABASE_URL', DEFAULT_DATABASE_URL),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+
+        # Esquema: por defecto se gestiona con `flask init-db`, no al arrancar
+        'AUTO_CREATE_SCHEMA': env_bool(environ, 'AUTO_CREATE_SCHEMA', False),
+
+        # Pool de conexiones
+        'DB_POOL_SIZE': env_int(environ, 'DB_POOL_SIZE', 5),
+        'DB_MAX_OVERFLOW': env_int(environ, 'DB_MAX_OVERFLOW', 10),
+        'DB_POOL_TIMEOUT': env_float(environ, 'DB_POOL_TIMEOUT', 10.0),
+        'DB_POOL_RECYCLE': env_int(environ, 'DB_POOL_RECYCLE', 1800),
+        'DB_POOL_PRE_PING': env_bool(environ, 'DB_POOL_PRE_PING', True),
+        'DB_STATEMENT_TIMEOUT_MS': env_int(environ, 'DB_STATEMENT_TIMEOUT_MS', 0),
+        'DB_POOL_WARMUP': env_int(environ, 'DB_POOL_WARMUP', 0),
+
+        'VERIFICATION_STORE': environ.get('VERIFICATION_STORE', 'sql'),
+        'VERIFICATION_SWEEP_INTERVAL': env_int(environ, 'VERIFICATION_SWEEP_INTERVAL', 0),
+
+        'SMS_PROVIDER': environ.get('SMS_PROVIDER', 'console'),
+        'SMS_SINK_PATH': environ.get('SMS_SINK_PATH', 'sms_outbox.jsonl'),
+        'SMS_WORKERS': env_int(environ, 'SMS_WORKERS', 2),
+
+        'INVITATION_CACHE_TTL': env_int(environ, 'INVITATION_CACHE_TTL', 60),
+        'INVITATION_BLOOM_FILTER': env_bool(environ, 'INVITATION_BLOOM_FILTER', False),
+        'INVITATION_BLOOM_REFRESH': env_int(environ, 'INVITATION_BLOOM_REFRESH', 30),
+
+        'RATELIMIT_ENABLED': env_bool(environ, 'RATELIMIT_ENABLED', True),
+        'RATELIMIT_MAX_CONCURRENT': env_int(environ, 'RATELIMIT_MAX_CONCURRENT', 0),
+        'RATELIMIT_TRUST_PROXY': env_bool(environ, 'RATELIMIT_TRUST_PROXY', False),
+        # Proxies propios delante de la app: la IP es la entrada N desde el final de X-Forwarded-For
+        'RATELIMIT_PROXY_HOPS': env_int(environ, 'RATELIMIT_PROXY_HOPS', 1),
+
+        'METRICS_ENABLED': env_bool(environ, 'METRICS_ENABLED', True),
+        'METRICS_SLOW_REQUEST_MS': env_int(environ, 'METRICS_SLOW_REQUEST_MS', 0),
+        'METRICS_TOKEN': environ.get('METRICS_TOKEN'),
+
+        'STATIC_MAX_INLINE_BYTES': env_int(environ, 'STATIC_MAX_INLINE_BYTES', 256 * 1024),
+
+        'ACCESS_TOKEN_TTL': env_int(environ, 'ACCESS_TOKEN_TTL', 900),
+        'REFRESH_TOKEN_TTL': env_int(environ, 'REFRESH_TOKEN_TTL', 30 * 86400),
+    }
+
+def engine_options(config):
+    """Traduce la configuración DB_* a SQLALCHEMY_ENGINE_OPTIONS según el motor"""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = {
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+    }
+
+    if url.get_backend_name() == 'sqlite':
+        # SQLAlchemy elige el pool de SQLite (fichero o memoria); no se dimensiona
+        return options
+
+    options.update({
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+    })
+
+    if config['DB_STATEMENT_TIMEOUT_MS'] and url.get_backend_name() == 'postgresql':
+        if url.get_driver_name() == 'asyncpg':
+            options['connect_args'] = {
+                'server_settings': {'statement_timeout': str(config['DB_STATEMENT_TIMEOUT_MS'])}
+            }
+        else:
+            options['connect_args'] = {
+                'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"
+            }
+    return options
+
+# Driver asyncio de cada motor para el modo de servicio ASGI (src/asgi.py)
+ASYNC_DRIVERS = {
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+}
+
+def async_database_url(database_url):
+    """Cambia el driver de la URL por su equivalente asyncio (sqlite -> sqlite+aiosqlite)"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'Modo asíncrono no soportado para {backend}')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}').render_as_string(hide_password=False)
@@ -10,9 +10,11 @@ class User(db.Model):
     phone_number = db.Column(db.String(20), unique=True, nullable=False)
     is_verified = db.Column(db.Boolean, default=False)
     is_admin = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    invited_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    invited_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
     invitation_code_used = db.Column(db.String(50), nullable=True)
+    # Se incrementa al revocar los tokens del usuario (logout); no se expone en to_dict
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     def __repr__(self):
         return f'<User {self.phone_number}>'
@@ -55,12 +57,15 @@ class Invitation(db.Model):
 
 class VerificationCode(db.Model):
     __tablename__ = 'verification_codes'
+    __table_args__ = (
+        db.Index('ix_verification_codes_lookup', 'phone_number', 'code', 'is_used'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     phone_number = db.Column(db.String(20), nullable=False)
     code = db.Column(db.String(6), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    expires_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
     is_used = db.Column(db.Boolean, default=False)
 
     def __repr__(self):
@@ -75,3 +80,68 @@ class VerificationCode(db.Model):
             'expires_at': self.expires_at.isoformat() if self.expires_at else None,
             'is_used': self.is_used
         }
+
+class UserAncestor(db.Model):
+    __tablename__ = 'user_ancestors'
+
+    # Tabla de cierre del árbol de invitaciones: una fila por cada par
+    # (ancestro, descendiente), incluida la fila (usuario, usuario, 0)
+    ancestor_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    descendant_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True, index=True)
+    depth = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'<UserAncestor {self.ancestor_id}->{self.descendant_id}>'
+
+    def to_dict(self):
+        return {
+            'ancestor_id': self.ancestor_id,
+            'descendant_id': self.descendant_id,
+            'depth': self.depth
+        }
+
+class DailyStats(db.Model):
+    __tablename__ = 'daily_stats'
+
+    # Contadores del embudo de altas por día (UTC), actualizados en las
+    # mismas transacciones que send_verification y verify_code
+    day = db.Column(db.Date, primary_key=True)
+    invitations_issued = db.Column(db.Integer, nullable=False, default=0)
+    invitations_used = db.Column(db.Integer, nullable=False, default=0)
+    codes_sent = db.Column(db.Integer, nullable=False, default=0)
+    codes_verified = db.Column(db.Integer, nullable=False, default=0)
+    signups = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DailyStats {self.day}>'
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat() if self.day else None,
+            'invitations_issued': self.invitations_issued,
+            'invitations_used': self.invitations_used,
+            'codes_sent': self.codes_sent,
+            'codes_verified': self.codes_verified,
+            'signups': self.signups
+        }
+
+class CreatorStats(db.Model):
+    __tablename__ = 'creator_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    invitations_issued = db.Column(db.Integer, nullable=False, default=0)
+    invitations_used = db.Column(db.Integer, nullable=False, default=0)
+    time_to_use_seconds = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f'<CreatorStats {self.user_id}>'
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'invitations_issued': self.invitations_issued,
+            'invitations_used': self.invitations_used,
+            'avg_time_to_use_seconds': (
+                self.time_to_use_seconds / self.invitations_used if self.invitations_used else None
+            )
+        }
@@ -1,5 +1,19 @@
-from flask import Blueprint, jsonify, request
-from src.models.user import User, Invitation, VerificationCode, db
+from flask import Blueprint, g, jsonify, request
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from src.models.user import User, Invitation, db
+from src.services.invitation_cache import get_invitation_lookup
+from src.services.invitation_tree import add_user_to_tree
+from src.services.metrics import note_exception
+from src.services.rate_limit import rate_limit
+from src.services.sms import get_sms_dispatcher
+from src.services.stats import record_codes_sent, record_signup
+from src.services.tokens import InvalidToken, get_token_service, require_auth
+from src.services.verification_store import (
+    VERIFICATION_EXPIRED,
+    VERIFICATION_OK,
+    get_verification_store,
+)
 from datetime import datetime, timedelta
 import random
 import re
@@ -16,7 +30,37 @@ def is_valid_phone_number(phone):
     pattern = r'^\+34\d{9}$'
     return re.match(pattern, phone) is not None
 
+def claim_invitation(code, now):
+    """Desactiva una invitación libre y devuelve (id, created_by, created_at), o None si no estaba libre.
+
+    El UPDATE condicional bloquea la fila en PostgreSQL, de modo que una
+    segunda transacción concurrente reevalúa la condición y no afecta a
+    ninguna fila. En SQLite la escritura toma el bloqueo de la base de datos.
+    """
+    stmt = (
+        update(Invitation)
+        .where(
+            Invitation.code == code,
+            Invitation.is_active == True,
+            Invitation.used_by.is_(None)
+        )
+        .values(is_active=False, used_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+    if db.session.get_bind().dialect.update_returning:
+        return db.session.execute(
+            stmt.returning(Invitation.id, Invitation.created_by, Invitation.created_at)
+        ).first()
+
+    if db.session.execute(stmt).rowcount == 0:
+        return None
+    return db.session.execute(
+        select(Invitation.id, Invitation.created_by, Invitation.created_at).where(Invitation.code == code)
+    ).first()
+
 @auth_bp.route('/check-invitation', methods=['POST'])
+@rate_limit(ip='30/minute', invitation='10/minute')
 def check_invitation():
     """Verifica si un código de invitación es válido"""
     try:
@@ -26,10 +70,10 @@ def check_invitation():
         if not invitation_code:
             return jsonify({'error': 'Código de invitación requerido'}), 400
         
-        # Buscar la invitación
-        invitation = Invitation.query.filter_by(code=invitation_code, is_active=True).first()
+        # Buscar la invitación (caché positiva y negativa delante de la base de datos)
+        invitation = get_invitation_lookup().get(invitation_code)
         
-        if not invitation:
+        if not invitation or not invitation.is_active:
             return jsonify({'error': 'Código de invitación inválido'}), 400
         
         if invitation.used_by:
@@ -41,9 +85,11 @@ def check_invitation():
         }), 200
         
     except Exception as e:
+        note_exception(e)
         return jsonify({'error': 'Error interno del servidor'}), 500
 
 @auth_bp.route('/send-verification', methods=['POST'])
+@rate_limit(ip='10/minute', phone='5/hour', invitation='10/hour')
 def send_verification():
     """Envía un código de verificación por SMS"""
     try:
@@ -58,8 +104,7 @@ def send_verification():
             return jsonify({'error': 'Formato de número de teléfono inválido'}), 400
         
         # Verificar que la invitación sea válida
-        invitation = Invitation.query.filter_by(code=invitation_code, is_active=True).first()
-        if not invitation or invitation.used_by:
+        if not get_invitation_lookup().get_available(invitation_code):
             return jsonify({'error': 'Código de invitación inválido o ya utilizado'}), 400
         
         # Verificar si el usuario ya existe
@@ -69,25 +114,23 @@ def send_verification():
         
         # Generar código de verificación
         verification_code = generate_verification_code()
-        expires_at = datetime.utcnow() + timedelta(minutes=10)
+        now = datetime.utcnow()
+        expires_at = now + timedelta(minutes=10)
         
-        # Eliminar códigos anteriores para este número
-        VerificationCode.query.filter_by(phone_number=phone_number).delete()
+        # Guardar el código, sustituyendo los anteriores para este número
+        get_verification_store().issue(phone_number, verification_code, expires_at)
+        record_codes_sent(now)
+        db.session.commit()
         
-        # Crear nuevo código de verificación
-        new_verification = VerificationCode(
-            phone_number=phone_number,
-            code=verification_code,
-            expires_at=expires_at
+        # El SMS se envía en segundo plano; la petición solo lo encola
+        sent = get_sms_dispatcher().enqueue(
+            phone_number,
+            f'Tu código de verificación es {verification_code}'
         )
+        if not sent:
+            return jsonify({'error': 'Servicio de SMS saturado, inténtalo más tarde'}), 503
         
-        db.session.add(new_verification)
-        db.session.commit()
-        
-        # TODO: Aquí se enviaría el SMS real
         # Por ahora, devolvemos el código en la respuesta para testing
-        print(f"Código de verificación para {phone_number}: {verification_code}")
-        
         return jsonify({
             'message': 'Código de verificación enviado',
             'verification_code': verification_code  # Solo para testing, remover en producción
@@ -95,11 +138,15 @@ def send_verification():
         
     except Exception as e:
         db.session.rollback()
+        note_exception(e)
         return jsonify({'error': 'Error interno del servidor'}), 500
 
 @auth_bp.route('/verify-code', methods=['POST'])
+@rate_limit(ip='20/minute', phone='10/hour', invitation='20/hour')
 def verify_code():
     """Verifica el código de verificación y crea el usuario"""
+    store = get_verification_store()
+    consumed = False
     try:
         data = request.json
         phone_number = data.get('phone_number', '').strip()
@@ -109,22 +156,28 @@ def verify_code():
         if not phone_number or not verification_code or not invitation_code:
             return jsonify({'error': 'Todos los campos son requeridos'}), 400
         
-        # Buscar el código de verificación
-        verification = VerificationCode.query.filter_by(
-            phone_number=phone_number,
-            code=verification_code,
-            is_used=False
-        ).first()
-        
-        if not verification:
-            return jsonify({'error': 'Código de verificación inválido'}), 400
+        # Rechazar invitaciones desconocidas o ya usadas sin tocar la base de datos
+        invitations = get_invitation_lookup()
+        if not invitations.get_available(invitation_code):
+            return jsonify({'error': 'Código de invitación inválido o ya utilizado'}), 400
         
-        if verification.expires_at < datetime.utcnow():
-            return jsonify({'error': 'Código de verificación expirado'}), 400
+        now = datetime.utcnow()
         
-        # Verificar la invitación
-        invitation = Invitation.query.filter_by(code=invitation_code, is_active=True).first()
-        if not invitation or invitation.used_by:
+        # Consumir el código de verificación de forma atómica
+        status = store.consume(phone_number, verification_code, now)
+        if status != VERIFICATION_OK:
+            db.session.rollback()
+            if status == VERIFICATION_EXPIRED:
+                return jsonify({'error': 'Código de verificación expirado'}), 400
+            return jsonify({'error': 'Código de verificación inválido'}), 400
+        consumed = True
+        
+        # Reclamar la invitación; la fila queda bloqueada hasta el commit
+        invitation = claim_invitation(invitation_code, now)
+        if invitation is None:
+            db.session.rollback()
+            store.restore(phone_number, verification_code)
+            invitations.invalidate(invitation_code)
             return jsonify({'error': 'Código de invitación inválido o ya utilizado'}), 400
         
         # Crear el usuario
@@ -136,27 +189,49 @@ def verify_code():
         )
         
         db.session.add(new_user)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            # Solo el teléfono duplicado es un error del cliente; cualquier otra
+            # restricción violada (p. ej. la clave foránea de invited_by) es un 500
+            if not db.session.execute(select(User.id).where(User.phone_number == phone_number)).first():
+                raise
+            store.restore(phone_number, verification_code)
+            return jsonify({'error': 'Este número de teléfono ya está registrado'}), 400
         
-        # Marcar la invitación como usada
-        invitation.used_by = new_user.id
-        invitation.used_at = datetime.utcnow()
-        invitation.is_active = False
+        # Registrar al usuario en el árbol de invitaciones
+        add_user_to_tree(new_user.id, invitation.created_by)
+        
+        # Enlazar la invitación con el usuario ya insertado
+        db.session.execute(
+            update(Invitation)
+            .where(Invitation.id == invitation.id)
+            .values(used_by=new_user.id)
+            .execution_options(synchronize_session=False)
+        )
         
-        # Marcar el código de verificación como usado
-        verification.is_used = True
+        # Contadores del embudo, en la misma transacción que el alta
+        record_signup(invitation.created_by, invitation.created_at, now)
         
+        user_data = new_user.to_dict()
         db.session.commit()
+        invitations.invalidate(invitation_code)
         
         return jsonify({
             'message': 'Usuario creado exitosamente',
-            'user': new_user.to_dict()
+            'user': user_data
         }), 201
         
     except Exception as e:
         db.session.rollback()
+        if consumed:
+            store.restore(phone_number, verification_code)
+        note_exception(e)
         return jsonify({'error': 'Error interno del servidor'}), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit(ip='20/minute', phone='10/minute')
 def login():
     """Inicia sesión con número de teléfono"""
     try:
@@ -175,11 +250,53 @@ def login():
         if not user:
             return jsonify({'error': 'Usuario no encontrado o no verificado'}), 404
         
+        user_data = user.to_dict()
+        tokens = get_token_service()
+        tokens.users.set(user.id, user_data)
+        
         return jsonify({
             'message': 'Login exitoso',
-            'user': user.to_dict()
+            'user': user_data,
+            **tokens.issue(user_data)
         }), 200
         
     except Exception as e:
+        note_exception(e)
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
+@auth_bp.route('/refresh-token', methods=['POST'])
+@rate_limit(ip='30/minute')
+def refresh_token():
+    """Canjea un token de refresco por un nuevo par de tokens"""
+    try:
+        data = request.json
+        token = data.get('refresh_token', '').strip()
+        
+        if not token:
+            return jsonify({'error': 'Token de refresco requerido'}), 400
+        
+        tokens = get_token_service()
+        try:
+            claims = tokens.verify_refresh(token)
+        except InvalidToken as e:
+            return jsonify({'error': str(e)}), 401
+        
+        # Releer el usuario (desde la caché) por si ha cambiado o dejado de estar verificado
+        user = tokens.get_user(claims['uid'])
+        if not user or not user['is_verified']:
+            return jsonify({'error': 'Usuario no encontrado o no verificado'}), 401
+        
+        return jsonify(tokens.issue(user)), 200
+        
+    except Exception as e:
+        note_exception(e)
         return jsonify({'error': 'Error interno del servidor'}), 500
 
+@auth_bp.route('/logout', methods=['POST'])
+@require_auth()
+def logout():
+    """Revoca los tokens emitidos para el usuario autenticado"""
+    get_token_service().revoke(g.auth['user_id'])
+    db.session.commit()
+    return jsonify({'message': 'Sesión cerrada'}), 200
+
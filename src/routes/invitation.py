@@ -0,0 +1,45 @@
+from flask import Blueprint, g, jsonify, request
+from src.models.user import User, db
+from src.services.invitation_cache import get_invitation_lookup
+from src.services.invitations import MAX_BULK_INVITATIONS, issue_invitations
+from src.services.metrics import note_exception
+from src.services.tokens import require_auth
+
+invitation_bp = Blueprint('invitation', __name__)
+
+@invitation_bp.route('/invitations/bulk', methods=['POST'])
+@require_auth(admin=True)
+def create_invitations_bulk():
+    """Emite en bloque `count` invitaciones para el administrador (o para `created_by`)"""
+    try:
+        data = request.json
+        count = data.get('count')
+        created_by = data.get('created_by', g.auth['user_id'])
+        
+        # bool es subclase de int: `true` no debe aceptarse como 1
+        if not isinstance(count, int) or isinstance(count, bool) or count < 1 or count > MAX_BULK_INVITATIONS:
+            return jsonify({'error': f'count debe estar entre 1 y {MAX_BULK_INVITATIONS}'}), 400
+        
+        if not isinstance(created_by, int) or isinstance(created_by, bool):
+            return jsonify({'error': 'created_by inválido'}), 400
+        
+        if db.session.get(User, created_by) is None:
+            return jsonify({'error': 'Usuario no encontrado'}), 404
+        
+        codes = issue_invitations(created_by, count)
+        db.session.commit()
+        
+        invitations = get_invitation_lookup()
+        for code in codes:
+            invitations.add(code)
+        
+        return jsonify({
+            'created_by': created_by,
+            'count': len(codes),
+            'codes': codes
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        note_exception(e)
+        return jsonify({'error': 'Error interno del servidor'}), 500
@@ -0,0 +1,49 @@
+from flask import Blueprint, Response, current_app, jsonify, request
+from src.models.user import db
+from src.services.metrics import get_metrics, render_prometheus
+
+metrics_bp = Blueprint('metrics', __name__)
+
+def collect_counters():
+    """Totales acumulados desde el arranque del proceso en los subsistemas"""
+    counters = {}
+
+    sms = current_app.extensions['sms_dispatcher'].stats()
+    counters['sms_sent_total'] = ('SMS enviados desde el arranque.', sms['sent'])
+    counters['sms_failed_total'] = ('SMS descartados tras agotar los reintentos.', sms['failed'])
+    counters['sms_dropped_total'] = ('SMS rechazados por cola llena.', sms['dropped'])
+
+    invitations = current_app.extensions['invitation_lookup'].stats()
+    counters['invitation_cache_hits_total'] = ('Aciertos de la caché positiva de invitaciones.', invitations['positive_hits'])
+    counters['invitation_negative_cache_hits_total'] = ('Aciertos de la caché negativa de invitaciones.', invitations['negative_hits'])
+    counters['invitation_bloom_rejections_total'] = ('Códigos rechazados por el filtro de Bloom.', invitations['bloom_rejections'])
+
+    limiter = current_app.extensions['rate_limiter'].stats()
+    counters['ratelimit_limited_total'] = ('Peticiones rechazadas con 429.', limiter['limited'])
+    counters['ratelimit_shed_total'] = ('Peticiones rechazadas con 503 por concurrencia.', limiter['shed'])
+    return counters
+
+def collect_gauges():
+    """Valores instantáneos de los subsistemas (colas, tiempos de envío, pool)"""
+    gauges = {}
+
+    sms = current_app.extensions['sms_dispatcher'].stats()
+    gauges['sms_queue_depth'] = ('Mensajes SMS pendientes en la cola.', sms['queue_depth'])
+    gauges['sms_time_to_send_seconds_avg'] = ('Tiempo medio desde que se encola hasta que se envía.', sms['time_to_send_seconds_avg'])
+    gauges['sms_time_to_send_seconds_max'] = ('Tiempo máximo desde que se encola hasta que se envía.', sms['time_to_send_seconds_max'])
+
+    pool = db.engine.pool
+    if hasattr(pool, 'checkedout'):
+        gauges['db_pool_checked_out'] = ('Conexiones del pool en uso.', pool.checkedout())
+        gauges['db_pool_size'] = ('Tamaño configurado del pool.', pool.size())
+    return gauges
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Exporta las métricas del proceso en formato de texto de Prometheus"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Autenticación requerida'}), 401
+
+    body = render_prometheus(get_metrics().snapshot(), collect_gauges(), collect_counters())
+    return Response(body, mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,38 @@
+from flask import Blueprint, jsonify
+from src.routes.user import parse_int_arg
+from src.services.metrics import note_exception
+from src.services.stats import daily_stats, funnel, top_creators
+from src.services.tokens import require_auth
+from datetime import datetime, timedelta
+
+stats_bp = Blueprint('stats', __name__)
+
+DEFAULT_DAYS = 30
+MAX_DAYS = 366
+DEFAULT_CREATORS = 20
+MAX_CREATORS = 100
+
+@stats_bp.route('/admin/stats', methods=['GET'])
+@require_auth(admin=True)
+def get_stats():
+    """Embudo de invitaciones y crecimiento de los últimos `days` días (tablas preagregadas)"""
+    try:
+        try:
+            days = parse_int_arg('days', default=DEFAULT_DAYS, minimum=1, maximum=MAX_DAYS)
+            creators = parse_int_arg('creators', default=DEFAULT_CREATORS, minimum=0, maximum=MAX_CREATORS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        until = datetime.utcnow().date()
+        daily = daily_stats(until - timedelta(days=days - 1), until)
+        
+        return jsonify({
+            'days': days,
+            'totals': funnel(daily),
+            'daily': daily,
+            'top_creators': top_creators(creators) if creators else []
+        }), 200
+        
+    except Exception as e:
+        note_exception(e)
+        return jsonify({'error': 'Error interno del servidor'}), 500
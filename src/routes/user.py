@@ -1,14 +1,155 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from src.models.user import User, db
+from src.services.invitation_tree import ancestors_query, descendants_query, remove_user_from_tree, tree_stats
+from src.services.tokens import get_token_service, is_self_or_admin, require_auth
+from datetime import datetime
+import json
 
 user_bp = Blueprint('user', __name__)
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 1000
+
+# Columnas que se proyectan en los listados (evita hidratar objetos ORM)
+USER_COLUMNS = (
+    User.id,
+    User.phone_number,
+    User.is_verified,
+    User.is_admin,
+    User.created_at,
+    User.invited_by,
+    User.invitation_code_used,
+)
+
+def user_row_to_dict(row):
+    """Convierte una fila proyectada de usuarios al mismo formato que User.to_dict()"""
+    return {
+        'id': row.id,
+        'phone_number': row.phone_number,
+        'is_verified': row.is_verified,
+        'is_admin': row.is_admin,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'invited_by': row.invited_by,
+        'invitation_code_used': row.invitation_code_used
+    }
+
+def parse_bool_arg(name):
+    """Lee un parámetro booleano de la query string (true/false, 1/0)"""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if value in ('1', 'true', 'yes'):
+        return True
+    if value in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f'Parámetro {name} inválido')
+
+def parse_int_arg(name, default=None, minimum=None, maximum=None):
+    """Lee un parámetro entero de la query string con límites opcionales"""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f'Parámetro {name} inválido')
+    if minimum is not None and value < minimum:
+        raise ValueError(f'Parámetro {name} inválido')
+    if maximum is not None and value > maximum:
+        value = maximum
+    return value
+
+def parse_datetime_arg(name):
+    """Lee una fecha ISO 8601 de la query string"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Parámetro {name} inválido')
+
+def build_users_query():
+    """Construye la consulta de usuarios con filtros y cursor a partir de la query string"""
+    query = select(*USER_COLUMNS)
+
+    after = parse_int_arg('after', minimum=0)
+    if after is not None:
+        query = query.where(User.id > after)
+
+    is_verified = parse_bool_arg('is_verified')
+    if is_verified is not None:
+        query = query.where(User.is_verified == is_verified)
+
+    is_admin = parse_bool_arg('is_admin')
+    if is_admin is not None:
+        query = query.where(User.is_admin == is_admin)
+
+    invited_by = parse_int_arg('invited_by', minimum=0)
+    if invited_by is not None:
+        query = query.where(User.invited_by == invited_by)
+
+    created_after = parse_datetime_arg('created_after')
+    if created_after is not None:
+        query = query.where(User.created_at >= created_after)
+
+    created_before = parse_datetime_arg('created_before')
+    if created_before is not None:
+        query = query.where(User.created_at < created_before)
+
+    return query.order_by(User.id)
+
+def stream_users(query):
+    """Genera los usuarios como NDJSON leyendo la consulta en lotes del servidor"""
+    result = db.session.execute(
+        query.execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+    try:
+        for partition in result.partitions():
+            yield ''.join(json.dumps(user_row_to_dict(row)) + '\n' for row in partition)
+    finally:
+        result.close()
+
 @user_bp.route('/users', methods=['GET'])
+@require_auth(admin=True)
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    """Lista usuarios paginados por cursor (?limit=&after=) o en streaming (?format=ndjson)"""
+    try:
+        query = build_users_query()
+        stream = request.args.get('format') == 'ndjson'
+        limit = parse_int_arg(
+            'limit',
+            default=None if stream else DEFAULT_PAGE_SIZE,
+            minimum=1,
+            maximum=None if stream else MAX_PAGE_SIZE
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if stream:
+        if limit is not None:
+            query = query.limit(limit)
+        return Response(
+            stream_with_context(stream_users(query)),
+            mimetype='application/x-ndjson'
+        )
+
+    # Se pide una fila extra para saber si existe una página siguiente
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    response = jsonify([user_row_to_dict(row) for row in rows])
+    if has_more:
+        response.headers['X-Next-Cursor'] = str(rows[-1].id)
+    return response
 
 @user_bp.route('/users', methods=['POST'])
+@require_auth(admin=True)
 def create_user():
     
     data = request.json
@@ -18,22 +159,84 @@ def create_user():
     return jsonify(user.to_dict()), 201
 
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
+@require_auth()
 def get_user(user_id):
-    user = User.query.get_or_404(user_id)
-    return jsonify(user.to_dict())
+    if not is_self_or_admin(user_id):
+        return jsonify({'error': 'Permisos insuficientes'}), 403
+    user = get_token_service().get_user(user_id)
+    if user is None:
+        return jsonify({'error': 'Usuario no encontrado'}), 404
+    return jsonify(user)
+
+@user_bp.route('/users/<int:user_id>/descendants', methods=['GET'])
+@require_auth()
+def get_user_descendants(user_id):
+    """Lista las personas invitadas por un usuario de forma transitiva (?max_depth=&limit=&after=)"""
+    if not is_self_or_admin(user_id):
+        return jsonify({'error': 'Permisos insuficientes'}), 403
+
+    try:
+        max_depth = parse_int_arg('max_depth', minimum=1)
+        after = parse_int_arg('after', minimum=0)
+        limit = parse_int_arg('limit', default=DEFAULT_PAGE_SIZE, minimum=1, maximum=MAX_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    query = descendants_query(user_id, USER_COLUMNS, max_depth=max_depth, after=after)
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    response = jsonify([dict(user_row_to_dict(row), depth=row.depth) for row in rows])
+    if has_more:
+        response.headers['X-Next-Cursor'] = str(rows[-1].id)
+    return response
+
+@user_bp.route('/users/<int:user_id>/ancestors', methods=['GET'])
+@require_auth()
+def get_user_ancestors(user_id):
+    """Devuelve la cadena de invitadores de un usuario hasta el Usuario Cero"""
+    if not is_self_or_admin(user_id):
+        return jsonify({'error': 'Permisos insuficientes'}), 403
+
+    rows = db.session.execute(ancestors_query(user_id, USER_COLUMNS)).all()
+    return jsonify([dict(user_row_to_dict(row), depth=row.depth) for row in rows])
+
+@user_bp.route('/users/<int:user_id>/tree', methods=['GET'])
+@require_auth()
+def get_user_tree(user_id):
+    """Devuelve la profundidad del usuario y el tamaño y altura de su subárbol"""
+    if not is_self_or_admin(user_id):
+        return jsonify({'error': 'Permisos insuficientes'}), 403
+
+    stats = tree_stats(user_id)
+    if stats is None:
+        return jsonify({'error': 'Usuario no encontrado'}), 404
+    return jsonify(stats)
 
 @user_bp.route('/users/<int:user_id>', methods=['PUT'])
+@require_auth(admin=True)
 def update_user(user_id):
     user = User.query.get_or_404(user_id)
     data = request.json
     user.username = data.get('username', user.username)
     user.email = data.get('email', user.email)
     db.session.commit()
+    get_token_service().users.pop(user_id)
     return jsonify(user.to_dict())
 
 @user_bp.route('/users/<int:user_id>', methods=['DELETE'])
+@require_auth(admin=True)
 def delete_user(user_id):
     user = User.query.get_or_404(user_id)
+    # Las filas de cierre se borran en la misma transacción que el usuario
+    remove_user_from_tree(user_id)
     db.session.delete(user)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Invitaciones, invitados o estadísticas que aún lo referencian
+        db.session.rollback()
+        return jsonify({'error': 'El usuario tiene invitaciones o invitados asociados'}), 409
+    get_token_service().revoke(user_id)
     return '', 204
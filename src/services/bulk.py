@@ -0,0 +1,51 @@
+from sqlalchemy import func, select, text
+from src.models.user import db
+
+def dialect_insert(model):
+    """INSERT con soporte de ON CONFLICT para el motor actual, o None si no lo tiene"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert(model)
+
+def upsert_rows(model, key, rows):
+    """Inserta o actualiza (por la columna única `key`) una lista de filas en una sentencia"""
+    if not rows:
+        return
+    stmt = dialect_insert(model)
+    if stmt is None:
+        raise RuntimeError(f'UPSERT no soportado en {db.session.get_bind().dialect.name}')
+
+    columns = [name for name in rows[0] if name not in ('id', key)]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={name: stmt.excluded[name] for name in columns}
+    )
+    db.session.execute(stmt, rows)
+
+def sync_id_sequence(model):
+    """Ajusta la secuencia del id en PostgreSQL tras insertar ids explícitos"""
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    table = model.__tablename__
+    max_id = db.session.execute(select(func.max(model.id))).scalar()
+    if max_id:
+        db.session.execute(
+            text("SELECT setval(pg_get_serial_sequence(:table, 'id'), :max_id)"),
+            {'table': table, 'max_id': max_id}
+        )
+
+def chunked(iterable, size):
+    """Agrupa un iterable en listas de como mucho `size` elementos"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,122 @@
+from sqlalchemy import select
+from src.models.user import Invitation, User, db
+from src.services.bulk import chunked, sync_id_sequence, upsert_rows
+from datetime import datetime
+import csv
+import json
+
+# Columnas exportadas/importadas y tipo de cada una
+TABLES = {
+    'users': {
+        'model': User,
+        'key': 'phone_number',
+        'columns': {
+            'id': int,
+            'phone_number': str,
+            'is_verified': bool,
+            'is_admin': bool,
+            'created_at': datetime,
+            'invited_by': int,
+            'invitation_code_used': str
+        }
+    },
+    'invitations': {
+        'model': Invitation,
+        'key': 'code',
+        'columns': {
+            'id': int,
+            'code': str,
+            'created_by': int,
+            'created_at': datetime,
+            'used_by': int,
+            'used_at': datetime,
+            'is_active': bool
+        }
+    }
+}
+
+def format_from_path(path, default='jsonl'):
+    if path and path.endswith('.csv'):
+        return 'csv'
+    if path and path.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return default
+
+def serialize(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def parse_value(value, kind):
+    """Convierte un valor leído de CSV/JSONL al tipo de la columna"""
+    if value is None or value == '':
+        return None
+    if kind is bool:
+        return value if isinstance(value, bool) else str(value).strip().lower() in ('1', 'true', 'yes')
+    if kind is int:
+        return int(value)
+    if kind is datetime:
+        return datetime.fromisoformat(value)
+    return str(value)
+
+def export_table(name, out, fmt='jsonl', batch_size=5000):
+    """Escribe la tabla en `out` leyendo por lotes del servidor; devuelve el número de filas"""
+    spec = TABLES[name]
+    model = spec['model']
+    columns = list(spec['columns'])
+
+    result = db.session.execute(
+        select(*[getattr(model, column) for column in columns])
+        .order_by(model.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    writer = None
+    if fmt == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(columns)
+
+    count = 0
+    for partition in result.partitions():
+        for row in partition:
+            values = [serialize(value) for value in row]
+            if writer:
+                writer.writerow(['' if value is None else value for value in values])
+            else:
+                out.write(json.dumps(dict(zip(columns, values))) + '\n')
+        count += len(partition)
+    return count
+
+def read_records(source, fmt):
+    if fmt == 'csv':
+        yield from csv.DictReader(source)
+    else:
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+
+def import_table(name, source, fmt='jsonl', chunk_size=1000):
+    """Inserta o actualiza filas por su clave única en lotes de `chunk_size`.
+
+    Las columnas ausentes en el fichero no se tocan. Devuelve el número de
+    filas procesadas; hace commit tras cada lote.
+    """
+    spec = TABLES[name]
+    model = spec['model']
+    kinds = spec['columns']
+
+    count = 0
+    for chunk in chunked(read_records(source, fmt), chunk_size):
+        rows = [
+            {column: parse_value(record[column], kinds[column]) for column in kinds if column in record}
+            for record in chunk
+        ]
+        # Sin id explícito en alguna fila se deja que la base de datos los asigne
+        if any(row.get('id') is None for row in rows):
+            for row in rows:
+                row.pop('id', None)
+        upsert_rows(model, spec['key'], rows)
+        db.session.commit()
+        count += len(rows)
+
+    sync_id_sequence(model)
+    db.session.commit()
+    return count
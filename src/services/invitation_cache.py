@@ -0,0 +1,240 @@
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import func, select
+from src.models.user import Invitation, db
+import hashlib
+import math
+import threading
+import time
+
+class TTLCache:
+    """Caché LRU acotada cuyas entradas caducan a los `ttl` segundos"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] < now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self._data)
+
+class BloomFilter:
+    """Filtro de Bloom sobre un bytearray con doble hashing (blake2b)"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.count = 0
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class InvitationLookup:
+    """Búsqueda de invitaciones por código con caché positiva y negativa.
+
+    Las invitaciones encontradas se guardan como filas (id, created_by,
+    used_by, is_active) durante `ttl` segundos y los códigos inexistentes
+    durante `negative_ttl`. Con `use_bloom` un filtro de Bloom con todos los
+    códigos emitidos rechaza los inexistentes sin consultar la base de datos.
+    Cada `bloom_refresh` segundos se le añaden los códigos creados desde la
+    carga anterior (por cualquier proceso o por la CLI), así que un código
+    emitido en otro worker se reconoce aquí en como mucho ese tiempo.
+
+    Ninguna consulta se hace con un lock tomado: en modo ASGI todas las
+    peticiones comparten un hilo y un lock retenido mientras se espera a la
+    base de datos bloquearía el bucle de eventos. Mientras una petición carga
+    el filtro, las demás lo tratan como ausente y consultan la base de datos.
+
+    La caché es por proceso: `verify_code` sigue validando la invitación con
+    un UPDATE condicional, así que una entrada desactualizada solo puede
+    adelantar la respuesta de `check-invitation`, nunca permitir un doble uso.
+    """
+
+    def __init__(self, maxsize=10000, ttl=60, negative_ttl=30, use_bloom=False, bloom_refresh=30):
+        self.positive = TTLCache(maxsize, ttl)
+        self.negative = TTLCache(maxsize, negative_ttl)
+        self.use_bloom = use_bloom
+        self.bloom_refresh = bloom_refresh
+        self._bloom = None
+        self._bloom_floor = 0
+        self._bloom_last_max = 0
+        self._bloom_refreshed_at = 0.0
+        self._bloom_loading = False
+        self._bloom_lock = threading.Lock()
+        self.bloom_rejections = 0
+
+    def rebuild_bloom(self):
+        """Carga todos los códigos emitidos en un filtro nuevo"""
+        count = db.session.execute(select(func.count(Invitation.id))).scalar()
+        bloom = BloomFilter(capacity=max(count * 2, 1024))
+        max_id = self._load_codes(bloom, 0)
+        self._bloom = bloom
+        self._bloom_floor = self._bloom_last_max = max_id
+        self._bloom_refreshed_at = time.monotonic()
+        return count
+
+    def refresh_bloom(self):
+        """Añade al filtro los códigos creados desde la carga anterior.
+
+        Un id se asigna al insertar pero la fila solo es visible tras el
+        commit, así que cada pasada vuelve a leer desde el máximo de la pasada
+        anterior: se recogen las transacciones que tarden menos que
+        `bloom_refresh` en confirmarse. Si el filtro se llena, se reconstruye.
+        """
+        if self._bloom.count >= self._bloom.capacity:
+            return self.rebuild_bloom()
+        max_id = self._load_codes(self._bloom, self._bloom_floor)
+        self._bloom_floor, self._bloom_last_max = self._bloom_last_max, max(max_id, self._bloom_last_max)
+        self._bloom_refreshed_at = time.monotonic()
+        return self._bloom.count
+
+    def _load_codes(self, bloom, after_id):
+        max_id = after_id
+        result = db.session.execute(
+            select(Invitation.id, Invitation.code)
+            .where(Invitation.id > after_id)
+            .execution_options(yield_per=5000)
+        )
+        for invitation_id, code in result:
+            bloom.add(code)
+            max_id = max(max_id, invitation_id)
+        return max_id
+
+    def _might_exist(self, code):
+        if not self.use_bloom:
+            return True
+        due = self._bloom is None or time.monotonic() - self._bloom_refreshed_at >= self.bloom_refresh
+        if due:
+            # Solo una petición carga el filtro; el lock no se retiene durante la consulta
+            with self._bloom_lock:
+                loading, self._bloom_loading = self._bloom_loading, True
+            if not loading:
+                try:
+                    if self._bloom is None:
+                        self.rebuild_bloom()
+                    else:
+                        self.refresh_bloom()
+                finally:
+                    self._bloom_loading = False
+        bloom = self._bloom
+        return bloom is None or code in bloom
+
+    def get(self, code):
+        """Devuelve la invitación como fila (id, created_by, used_by, is_active) o None"""
+        invitation = self.positive.get(code)
+        if invitation is not None:
+            return invitation
+        if code in self.negative:
+            return None
+        if not self._might_exist(code):
+            self.bloom_rejections += 1
+            return None
+
+        invitation = db.session.execute(
+            select(
+                Invitation.id,
+                Invitation.created_by,
+                Invitation.used_by,
+                Invitation.is_active
+            ).where(Invitation.code == code)
+        ).first()
+
+        if invitation is None:
+            self.negative.set(code, True)
+            return None
+
+        self.positive.set(code, invitation)
+        return invitation
+
+    def get_available(self, code):
+        """Devuelve la invitación solo si está activa y sin usar"""
+        invitation = self.get(code)
+        if invitation is None:
+            return None
+        if not invitation.is_active or invitation.used_by:
+            return None
+        return invitation
+
+    def invalidate(self, code):
+        """Olvida un código tras consumirlo o modificarlo"""
+        self.positive.pop(code)
+        self.negative.pop(code)
+
+    def add(self, code):
+        """Registra un código recién creado"""
+        self.negative.pop(code)
+        if self._bloom is not None:
+            self._bloom.add(code)
+
+    def stats(self):
+        return {
+            'positive_entries': len(self.positive),
+            'positive_hits': self.positive.hits,
+            'negative_entries': len(self.negative),
+            'negative_hits': self.negative.hits,
+            'bloom_rejections': self.bloom_rejections
+        }
+
+def init_invitation_lookup(app):
+    """Crea la caché de invitaciones con la configuración INVITATION_CACHE_*"""
+    lookup = InvitationLookup(
+        maxsize=app.config.get('INVITATION_CACHE_SIZE', 10000),
+        ttl=app.config.get('INVITATION_CACHE_TTL', 60),
+        negative_ttl=app.config.get('INVITATION_NEGATIVE_TTL', 30),
+        use_bloom=app.config.get('INVITATION_BLOOM_FILTER', False),
+        bloom_refresh=app.config.get('INVITATION_BLOOM_REFRESH', 30)
+    )
+    app.extensions['invitation_lookup'] = lookup
+    return lookup
+
+def get_invitation_lookup():
+    """Devuelve la caché de invitaciones de la aplicación actual"""
+    return current_app.extensions['invitation_lookup']
@@ -0,0 +1,180 @@
+from flask import current_app
+from sqlalchemy import delete, func, insert, literal, select, union_all
+from src.models.user import User, UserAncestor, db
+
+# Profundidad máxima que se recorre al reconstruir la tabla de cierre
+MAX_TREE_DEPTH = 10000
+
+def use_closure_table():
+    """Indica si las consultas del árbol usan la tabla de cierre o un CTE recursivo"""
+    return current_app.config.get('INVITATION_TREE_STRATEGY', 'closure') != 'cte'
+
+def add_user_to_tree(user_id, invited_by=None):
+    """Inserta las filas de cierre de un usuario nuevo en una sola sentencia.
+
+    Debe ejecutarse dentro de la misma transacción que crea el usuario.
+    """
+    rows = select(
+        literal(user_id).label('ancestor_id'),
+        literal(user_id).label('descendant_id'),
+        literal(0).label('depth')
+    )
+    if invited_by is not None:
+        rows = union_all(
+            rows,
+            select(
+                UserAncestor.ancestor_id,
+                literal(user_id),
+                UserAncestor.depth + 1
+            ).where(UserAncestor.descendant_id == invited_by)
+        )
+
+    db.session.execute(
+        insert(UserAncestor).from_select(['ancestor_id', 'descendant_id', 'depth'], rows)
+    )
+
+def remove_user_from_tree(user_id):
+    """Borra las filas de cierre que pasan por un usuario que se va a eliminar; no hace commit.
+
+    Se eliminan sus propias filas y las que unen a sus ancestros con sus
+    descendientes: sin el usuario, su subárbol queda desenganchado igual
+    que lo vería el CTE recursivo sobre users.invited_by. Las filas internas
+    de cada subárbol se conservan.
+    """
+    subtree = select(UserAncestor.descendant_id).where(UserAncestor.ancestor_id == user_id)
+    inner = subtree.where(UserAncestor.depth > 0)
+    db.session.execute(
+        delete(UserAncestor)
+        .where(UserAncestor.descendant_id.in_(subtree), UserAncestor.ancestor_id.not_in(inner))
+        .execution_options(synchronize_session=False)
+    )
+
+def rebuild_tree():
+    """Reconstruye la tabla de cierre desde users.invited_by, un nivel por sentencia"""
+    db.session.execute(delete(UserAncestor))
+    inserted = db.session.execute(
+        insert(UserAncestor).from_select(
+            ['ancestor_id', 'descendant_id', 'depth'],
+            select(User.id, User.id, literal(0))
+        )
+    ).rowcount
+    total = inserted
+
+    depth = 0
+    while inserted and depth < MAX_TREE_DEPTH:
+        # Cada usuario hereda los ancestros de su invitador que están a profundidad `depth`
+        inserted = db.session.execute(
+            insert(UserAncestor).from_select(
+                ['ancestor_id', 'descendant_id', 'depth'],
+                select(
+                    UserAncestor.ancestor_id,
+                    User.id,
+                    UserAncestor.depth + 1
+                )
+                .join(User, User.invited_by == UserAncestor.descendant_id)
+                .where(UserAncestor.depth == depth)
+            )
+        ).rowcount
+        total += inserted
+        depth += 1
+
+    db.session.commit()
+    return total
+
+def _descendants_cte(user_id):
+    """CTE recursivo con (id, depth) de los descendientes de un usuario"""
+    tree = select(User.id, literal(0).label('depth')).where(User.id == user_id).cte(
+        'descendants', recursive=True
+    )
+    return tree.union_all(
+        select(User.id, tree.c.depth + 1).where(User.invited_by == tree.c.id)
+    )
+
+def _ancestors_cte(user_id):
+    """CTE recursivo con (id, depth) de la cadena de invitadores hasta la raíz"""
+    chain = select(
+        User.id, User.invited_by, literal(0).label('depth')
+    ).where(User.id == user_id).cte('ancestors', recursive=True)
+    return chain.union_all(
+        select(User.id, User.invited_by, chain.c.depth + 1).where(User.id == chain.c.invited_by)
+    )
+
+def descendants_query(user_id, columns, max_depth=None, after=None):
+    """Consulta de descendientes (sin el propio usuario) ordenada por id para paginar"""
+    if use_closure_table():
+        query = (
+            select(*columns, UserAncestor.depth.label('depth'))
+            .join(UserAncestor, UserAncestor.descendant_id == User.id)
+            .where(UserAncestor.ancestor_id == user_id, UserAncestor.depth > 0)
+        )
+        depth_column = UserAncestor.depth
+    else:
+        tree = _descendants_cte(user_id)
+        query = (
+            select(*columns, tree.c.depth.label('depth'))
+            .join(tree, tree.c.id == User.id)
+            .where(tree.c.depth > 0)
+        )
+        depth_column = tree.c.depth
+
+    if max_depth is not None:
+        query = query.where(depth_column <= max_depth)
+    if after is not None:
+        query = query.where(User.id > after)
+    return query.order_by(User.id)
+
+def ancestors_query(user_id, columns):
+    """Consulta de la cadena de invitadores, del más cercano a la raíz"""
+    if use_closure_table():
+        return (
+            select(*columns, UserAncestor.depth.label('depth'))
+            .join(UserAncestor, UserAncestor.ancestor_id == User.id)
+            .where(UserAncestor.descendant_id == user_id, UserAncestor.depth > 0)
+            .order_by(UserAncestor.depth)
+        )
+
+    chain = _ancestors_cte(user_id)
+    return (
+        select(*columns, chain.c.depth.label('depth'))
+        .join(chain, chain.c.id == User.id)
+        .where(chain.c.depth > 0)
+        .order_by(chain.c.depth)
+    )
+
+def tree_stats(user_id):
+    """Devuelve profundidad, tamaño y altura del subárbol de un usuario, o None si no existe"""
+    if use_closure_table():
+        depth = (
+            select(func.max(UserAncestor.depth))
+            .where(UserAncestor.descendant_id == user_id)
+            .scalar_subquery()
+        )
+        subtree = select(
+            func.count(UserAncestor.descendant_id),
+            func.max(UserAncestor.depth)
+        ).where(UserAncestor.ancestor_id == user_id)
+        row = db.session.execute(
+            subtree.add_columns(depth.label('depth'))
+        ).one()
+        size, height, depth = row
+    else:
+        tree = _descendants_cte(user_id)
+        chain = _ancestors_cte(user_id)
+        row = db.session.execute(
+            select(
+                func.count(tree.c.id),
+                func.max(tree.c.depth),
+                select(func.max(chain.c.depth)).scalar_subquery()
+            )
+        ).one()
+        size, height, depth = row
+
+    if depth is None:
+        return None
+
+    return {
+        'user_id': user_id,
+        'depth': depth,
+        'subtree_size': size - 1,
+        'subtree_depth': height or 0
+    }
@@ -0,0 +1,51 @@
+from sqlalchemy import insert, select
+from src.models.user import Invitation, db
+from src.services.bulk import dialect_insert
+from src.services.stats import record_invitations_issued
+from datetime import datetime
+import secrets
+
+# Sin caracteres ambiguos (0/O, 1/I/L); 12 caracteres ≈ 60 bits de entropía
+CODE_ALPHABET = 'ABCDEFGHJKMNPQRSTUVWXYZ23456789'
+CODE_LENGTH = 12
+MAX_BULK_INVITATIONS = 10000
+
+def generate_invitation_code():
+    """Genera un código de invitación aleatorio criptográficamente seguro"""
+    return ''.join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+
+def _insert_batch(created_by, codes):
+    """Inserta un lote con un único INSERT multi-fila y devuelve los códigos insertados"""
+    rows = [{'code': code, 'created_by': created_by, 'is_active': True} for code in codes]
+
+    stmt = dialect_insert(Invitation)
+    if stmt is not None:
+        # Los códigos que ya existan se descartan sin romper el lote
+        result = db.session.execute(
+            stmt.on_conflict_do_nothing(index_elements=['code']).returning(Invitation.code),
+            rows
+        )
+        return set(result.scalars())
+
+    existing = set(db.session.execute(
+        select(Invitation.code).where(Invitation.code.in_(codes))
+    ).scalars())
+    rows = [row for row in rows if row['code'] not in existing]
+    if rows:
+        db.session.execute(insert(Invitation), rows)
+    return {row['code'] for row in rows}
+
+def issue_invitations(created_by, count, batch_size=1000):
+    """Crea `count` invitaciones para `created_by` en lotes; no hace commit.
+
+    Los códigos que colisionan con otros ya emitidos se regeneran hasta
+    completar el número pedido.
+    """
+    issued = []
+    while len(issued) < count:
+        pending = min(batch_size, count - len(issued))
+        codes = {generate_invitation_code() for _ in range(pending)}
+        inserted = _insert_batch(created_by, list(codes))
+        issued.extend(sorted(inserted))
+    record_invitations_issued(created_by, len(issued), datetime.utcnow())
+    return issued
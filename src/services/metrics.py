@@ -0,0 +1,290 @@
+from bisect import bisect_left
+from flask import current_app, g, got_request_exception, has_request_context, request
+from sqlalchemy import event
+import threading
+import time
+import weakref
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+class Histogram:
+    """Histograma con contadores por bucket (no acumulados), suma y total"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        for i, value in enumerate(other.counts):
+            self.counts[i] += value
+        self.sum += other.sum
+        self.count += other.count
+
+class MetricsShard:
+    """Agregados de un único hilo; solo ese hilo escribe en ellos"""
+
+    def __init__(self):
+        self.requests = {}
+        self.latency = {}
+        self.sql_statements = {}
+        self.sql_seconds = {}
+        self.pool_wait = Histogram(POOL_WAIT_BUCKETS)
+        self.exceptions = {}
+
+    def merge(self, other):
+        """Suma en este shard los valores de `other` (que puede seguir recibiendo escrituras)"""
+        for key, value in other.requests.copy().items():
+            self.requests[key] = self.requests.get(key, 0) + value
+        for key, histogram in other.latency.copy().items():
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).merge(histogram)
+        for key, value in other.sql_statements.copy().items():
+            self.sql_statements[key] = self.sql_statements.get(key, 0) + value
+        for key, value in other.sql_seconds.copy().items():
+            self.sql_seconds[key] = self.sql_seconds.get(key, 0.0) + value
+        for key, value in other.exceptions.copy().items():
+            self.exceptions[key] = self.exceptions.get(key, 0) + value
+        self.pool_wait.merge(other.pool_wait)
+
+class _ThreadHandle:
+    """Objeto que solo vive en el threading.local de un hilo: muere con él"""
+
+    __slots__ = ('shard', '__weakref__')
+
+    def __init__(self, shard):
+        self.shard = shard
+
+class MetricsRegistry:
+    """Métricas del proceso repartidas en un shard por hilo.
+
+    Cada hilo escribe sin locks en su propio shard; el lock solo se toma al
+    registrar un hilo nuevo, al retirarlo y al exportar. Cuando un hilo
+    termina (p. ej. los que recicla el servidor), su shard se suma a un
+    total compartido y deja de recorrerse, así que la lista de shards no
+    crece con los hilos que han existido sino con los que siguen vivos.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._retired = MetricsShard()
+        self._lock = threading.Lock()
+
+    def shard(self):
+        handle = getattr(self._local, 'handle', None)
+        if handle is None:
+            handle = self._local.handle = _ThreadHandle(MetricsShard())
+            with self._lock:
+                self._shards.append(handle.shard)
+            weakref.finalize(handle, self._retire, handle.shard)
+        return handle.shard
+
+    def _retire(self, shard):
+        with self._lock:
+            self._shards.remove(shard)
+            self._retired.merge(shard)
+
+    def __len__(self):
+        """Número de shards de hilos vivos"""
+        with self._lock:
+            return len(self._shards)
+
+    def observe_request(self, endpoint, method, status, seconds, statements, sql_seconds):
+        shard = self.shard()
+        key = (endpoint, method, status)
+        shard.requests[key] = shard.requests.get(key, 0) + 1
+        histogram = shard.latency.get(endpoint)
+        if histogram is None:
+            histogram = shard.latency[endpoint] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(seconds)
+        shard.sql_statements[endpoint] = shard.sql_statements.get(endpoint, 0) + statements
+        shard.sql_seconds[endpoint] = shard.sql_seconds.get(endpoint, 0.0) + sql_seconds
+
+    def observe_pool_wait(self, seconds):
+        self.shard().pool_wait.observe(seconds)
+
+    def record_exception(self, exc):
+        shard = self.shard()
+        name = type(exc).__name__
+        shard.exceptions[name] = shard.exceptions.get(name, 0) + 1
+
+    def snapshot(self):
+        """Suma los shards de todos los hilos, vivos y retirados"""
+        total = MetricsShard()
+        # Con el lock tomado un shard no puede pasar de la lista al total a mitad de la suma
+        with self._lock:
+            total.merge(self._retired)
+            for shard in self._shards:
+                total.merge(shard)
+        return {
+            'requests': total.requests,
+            'latency': total.latency,
+            'sql_statements': total.sql_statements,
+            'sql_seconds': total.sql_seconds,
+            'pool_wait': total.pool_wait,
+            'exceptions': total.exceptions
+        }
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+def render_histogram(lines, name, histogram, labels=()):
+    cumulative = 0
+    for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+        cumulative += count
+        le = '+Inf' if bound == float('inf') else repr(bound)
+        lines.append(f'{name}_bucket{format_labels(labels + (("le", le),))} {cumulative}')
+    lines.append(f'{name}_sum{format_labels(labels)} {histogram.sum}')
+    lines.append(f'{name}_count{format_labels(labels)} {histogram.count}')
+
+def render_prometheus(snapshot, gauges=None, counters=None):
+    """Genera el formato de texto de Prometheus a partir de `snapshot()`.
+
+    `counters` y `gauges` son diccionarios nombre -> (ayuda, valor) de otros
+    subsistemas; los contadores deben llevar ya el sufijo `_total`.
+    """
+    lines = [
+        '# HELP http_requests_total Peticiones HTTP por endpoint, método y estado.',
+        '# TYPE http_requests_total counter'
+    ]
+    for (endpoint, method, status), value in sorted(snapshot['requests'].items()):
+        labels = (('endpoint', endpoint), ('method', method), ('status', status))
+        lines.append(f'http_requests_total{format_labels(labels)} {value}')
+
+    lines += [
+        '# HELP http_request_duration_seconds Latencia de las peticiones por endpoint.',
+        '# TYPE http_request_duration_seconds histogram'
+    ]
+    for endpoint, histogram in sorted(snapshot['latency'].items()):
+        render_histogram(lines, 'http_request_duration_seconds', histogram, (('endpoint', endpoint),))
+
+    lines += [
+        '# HELP sql_statements_total Sentencias SQL ejecutadas por endpoint.',
+        '# TYPE sql_statements_total counter'
+    ]
+    for endpoint, value in sorted(snapshot['sql_statements'].items()):
+        lines.append(f'sql_statements_total{format_labels((("endpoint", endpoint),))} {value}')
+
+    lines += [
+        '# HELP sql_duration_seconds_total Tiempo en sentencias SQL por endpoint.',
+        '# TYPE sql_duration_seconds_total counter'
+    ]
+    for endpoint, value in sorted(snapshot['sql_seconds'].items()):
+        lines.append(f'sql_duration_seconds_total{format_labels((("endpoint", endpoint),))} {value}')
+
+    lines += [
+        '# HELP db_pool_checkout_wait_seconds Espera para obtener una conexión del pool.',
+        '# TYPE db_pool_checkout_wait_seconds histogram'
+    ]
+    render_histogram(lines, 'db_pool_checkout_wait_seconds', snapshot['pool_wait'])
+
+    lines += [
+        '# HELP exceptions_total Excepciones capturadas por tipo.',
+        '# TYPE exceptions_total counter'
+    ]
+    for name, value in sorted(snapshot['exceptions'].items()):
+        lines.append(f'exceptions_total{format_labels((("type", name),))} {value}')
+
+    for name, (help_text, value) in sorted((counters or {}).items()):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter', f'{name} {value}']
+
+    for name, (help_text, value) in sorted((gauges or {}).items()):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge', f'{name} {value}']
+
+    return '\n'.join(lines) + '\n'
+
+def get_metrics():
+    """Devuelve el registro de métricas de la aplicación actual"""
+    return current_app.extensions['metrics']
+
+def note_exception(exc):
+    """Cuenta y registra una excepción que el handler convierte en un 500"""
+    current_app.extensions['metrics'].record_exception(exc)
+    current_app.logger.exception('Error en %s', request.endpoint)
+
+def _on_request_exception(sender, exception, **extra):
+    # Excepciones que ningún handler captura; Flask las registra y responde 500
+    sender.extensions['metrics'].record_exception(exception)
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.sql_count = 0
+    g.sql_seconds = 0.0
+    if current_app.config.get('METRICS_SLOW_REQUEST_MS'):
+        g.sql_log = []
+
+def _after_request(response):
+    started = g.get('metrics_started')
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = request.endpoint or 'unmatched'
+    current_app.extensions['metrics'].observe_request(
+        endpoint, request.method, response.status_code, elapsed, g.sql_count, g.sql_seconds
+    )
+
+    slow_ms = current_app.config.get('METRICS_SLOW_REQUEST_MS')
+    if slow_ms and elapsed * 1000 >= slow_ms:
+        statements = '\n'.join(f'  {ms:.1f} ms  {sql}' for ms, sql in g.get('sql_log', []))
+        current_app.logger.warning(
+            'Petición lenta: %s %s -> %s en %.1f ms con %d sentencias SQL\n%s',
+            request.method, request.path, response.status_code, elapsed * 1000, g.sql_count, statements
+        )
+    return response
+
+def _instrument_engine(engine, registry):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        if has_request_context() and 'sql_count' in g:
+            g.sql_count += 1
+            g.sql_seconds += elapsed
+            if 'sql_log' in g:
+                g.sql_log.append((elapsed * 1000, statement))
+
+    # El pool no emite un evento antes del checkout; se envuelve `connect`
+    # (el método que llama Engine.raw_connection) para medir la espera
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            registry.observe_pool_wait(time.perf_counter() - started)
+
+    pool.connect = timed_connect
+
+def init_metrics(app, db):
+    """Engancha las métricas a las peticiones de Flask y a los motores de SQLAlchemy"""
+    registry = MetricsRegistry()
+    app.extensions['metrics'] = registry
+    if not app.config.get('METRICS_ENABLED', True):
+        return registry
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    got_request_exception.connect(_on_request_exception, app)
+    with app.app_context():
+        for engine in db.engines.values():
+            _instrument_engine(engine, registry)
+    return registry
@@ -0,0 +1,199 @@
+from flask import current_app, jsonify, request
+from functools import wraps
+import math
+import threading
+import time
+import zlib
+
+PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400
+}
+
+def parse_rate(rate):
+    """Convierte '10/minute' en (tokens por segundo, capacidad del bucket)"""
+    count, period = rate.split('/')
+    count = int(count)
+    return count / PERIODS[period.strip()], count
+
+class RateLimitBackend:
+    """Almacén de token buckets.
+
+    `consume` descuenta `cost` tokens del bucket `key` (que se rellena a `rate`
+    tokens por segundo hasta `capacity`) y devuelve (permitido, segundos hasta
+    que haya tokens suficientes). Un backend compartido (p. ej. Redis con un
+    script Lua) puede sustituir al de memoria implementando este método.
+    """
+
+    def consume(self, key, rate, capacity, cost=1):
+        raise NotImplementedError
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Token buckets en memoria del proceso, repartidos en stripes con su propio lock.
+
+    Cada bucket guarda (tokens, última actualización, instante en que vuelve
+    a estar lleno). Una stripe mezcla buckets de reglas distintas, así que al
+    superar `max_keys_per_stripe` solo se descartan los que ya estarían
+    llenos según su propia regla: equivalen a no tenerlos. Ese recorrido es
+    O(n), así que cada stripe lo hace como mucho una vez cada
+    `evict_interval` segundos aunque siga por encima del límite.
+    """
+
+    def __init__(self, stripes=64, max_keys_per_stripe=10000, evict_interval=1.0, clock=time.monotonic):
+        self._stripes = [(threading.Lock(), {}) for _ in range(stripes)]
+        self._next_evict = [0.0] * stripes
+        self.max_keys_per_stripe = max_keys_per_stripe
+        self.evict_interval = evict_interval
+        self.clock = clock
+
+    def consume(self, key, rate, capacity, cost=1):
+        index = zlib.crc32(key.encode()) % len(self._stripes)
+        lock, buckets = self._stripes[index]
+        now = self.clock()
+        with lock:
+            tokens, updated, _ = buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= cost:
+                tokens -= cost
+                allowed, retry_after = True, 0.0
+            else:
+                allowed, retry_after = False, (cost - tokens) / rate
+            buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            if len(buckets) > self.max_keys_per_stripe and now >= self._next_evict[index]:
+                self._next_evict[index] = now + self.evict_interval
+                self._evict_full(buckets, now)
+        return allowed, retry_after
+
+    @staticmethod
+    def _evict_full(buckets, now):
+        for key in [k for k, (_, _, full_at) in buckets.items() if full_at <= now]:
+            del buckets[key]
+
+    def __len__(self):
+        return sum(len(buckets) for _, buckets in self._stripes)
+
+class ConcurrencyLimiter:
+    """Limita las peticiones simultáneas; las que exceden el límite se rechazan al momento"""
+
+    def __init__(self, max_concurrent):
+        self.max_concurrent = max_concurrent
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self.shed = 0
+
+    def try_acquire(self):
+        if self._slots.acquire(blocking=False):
+            return True
+        self.shed += 1
+        return False
+
+    def release(self):
+        self._slots.release()
+
+class RateLimiter:
+    """Configuración de límites de la aplicación (backend + límite de concurrencia)"""
+
+    def __init__(self, backend, max_concurrent=0, enabled=True, proxy_hops=0):
+        self.backend = backend
+        self.concurrency = ConcurrencyLimiter(max_concurrent) if max_concurrent else None
+        self.enabled = enabled
+        self.proxy_hops = proxy_hops
+        self.limited = 0
+
+    def client_ip(self):
+        """IP del cliente según los `proxy_hops` proxies de confianza, como ProxyFix(x_for=N).
+
+        Cada proxy añade al final de X-Forwarded-For la dirección de quien le
+        conecta; las entradas anteriores las escribe el cliente y no sirven
+        para identificarlo. Si hay menos entradas que proxies se usa la
+        dirección de la conexión.
+        """
+        if self.proxy_hops:
+            forwarded = [ip.strip() for ip in request.headers.get('X-Forwarded-For', '').split(',') if ip.strip()]
+            if len(forwarded) >= self.proxy_hops:
+                return forwarded[-self.proxy_hops]
+        return request.remote_addr or 'unknown'
+
+    def check(self, rules):
+        """Consume un token de cada regla; devuelve los segundos de espera si alguna se agota"""
+        data = None
+        for scope, field, rate, capacity in rules:
+            if scope == 'ip':
+                value = self.client_ip()
+            else:
+                if data is None:
+                    data = request.get_json(silent=True)
+                    if not isinstance(data, dict):
+                        data = {}
+                value = data.get(field)
+                if not isinstance(value, str) or not value.strip():
+                    continue
+                value = value.strip()
+
+            allowed, retry_after = self.backend.consume(
+                f'{scope}:{request.endpoint}:{value}', rate, capacity
+            )
+            if not allowed:
+                self.limited += 1
+                return retry_after
+        return None
+
+    def stats(self):
+        return {
+            'limited': self.limited,
+            'shed': self.concurrency.shed if self.concurrency else 0
+        }
+
+# Campo del cuerpo JSON que identifica cada ámbito
+SCOPE_FIELDS = {
+    'ip': None,
+    'phone': 'phone_number',
+    'invitation': 'invitation_code'
+}
+
+def rate_limit(**limits):
+    """Aplica token buckets por ámbito, p. ej. @rate_limit(ip='10/minute', phone='5/hour').
+
+    Se evalúa antes de ejecutar la vista, por lo que una petición rechazada
+    (429 por límite o 503 por exceso de concurrencia) nunca abre una conexión
+    a la base de datos.
+    """
+    rules = [(scope, SCOPE_FIELDS[scope]) + parse_rate(rate) for scope, rate in limits.items()]
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            limiter = current_app.extensions.get('rate_limiter')
+            if limiter is None or not limiter.enabled:
+                return view(*args, **kwargs)
+
+            retry_after = limiter.check(rules)
+            if retry_after is not None:
+                response = jsonify({'error': 'Demasiadas peticiones, inténtalo más tarde'})
+                response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                return response, 429
+
+            if limiter.concurrency is None:
+                return view(*args, **kwargs)
+            if not limiter.concurrency.try_acquire():
+                response = jsonify({'error': 'Servicio saturado, inténtalo más tarde'})
+                response.headers['Retry-After'] = '1'
+                return response, 503
+            try:
+                return view(*args, **kwargs)
+            finally:
+                limiter.concurrency.release()
+        return wrapper
+    return decorator
+
+def init_rate_limiter(app, backend=None):
+    """Crea el limitador con la configuración RATELIMIT_*"""
+    limiter = RateLimiter(
+        backend or MemoryRateLimitBackend(stripes=app.config.get('RATELIMIT_STRIPES', 64)),
+        max_concurrent=app.config.get('RATELIMIT_MAX_CONCURRENT', 0),
+        enabled=app.config.get('RATELIMIT_ENABLED', True),
+        proxy_hops=app.config.get('RATELIMIT_PROXY_HOPS', 1) if app.config.get('RATELIMIT_TRUST_PROXY') else 0
+    )
+    app.extensions['rate_limiter'] = limiter
+    return limiter
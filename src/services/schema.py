@@ -0,0 +1,34 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from src.models.user import db
+
+def upgrade_schema():
+    """Crea las tablas que falten y añade a las existentes las columnas e índices que falten.
+
+    `db.create_all()` solo crea tablas nuevas: una base de datos anterior a
+    un índice o a una columna nunca la recibe. Aquí las columnas nuevas se
+    añaden con ALTER TABLE (deben admitir NULL o tener server_default) y cada
+    índice del modelo se crea con comprobación previa (equivalente a CREATE
+    INDEX IF NOT EXISTS), así que el paso es idempotente. Devuelve los nombres
+    de las columnas e índices creados.
+    """
+    db.create_all()
+
+    created = []
+    with db.engine.begin() as connection:
+        inspector = inspect(connection)
+        preparer = connection.dialect.identifier_preparer
+        for table in db.metadata.sorted_tables:
+            columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    definition = CreateColumn(column).compile(dialect=connection.dialect)
+                    connection.execute(text(f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {definition}'))
+                    created.append(f'{table.name}.{column.name}')
+
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name not in existing:
+                    index.create(connection)
+                    created.append(index.name)
+    return created
@@ -0,0 +1,238 @@
+from flask import current_app
+import atexit
+import json
+import queue
+import threading
+import time
+
+class OutboundSms:
+    """Mensaje pendiente de envío"""
+
+    __slots__ = ('phone_number', 'body', 'enqueued_at', 'attempts')
+
+    def __init__(self, phone_number, body):
+        self.phone_number = phone_number
+        self.body = body
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+    def to_dict(self):
+        return {
+            'phone_number': self.phone_number,
+            'body': self.body
+        }
+
+class SmsProvider:
+    """Proveedor de SMS.
+
+    `send_batch` recibe una lista de mensajes y devuelve los que fallaron (o
+    lanza una excepción si falló el lote completo). `max_concurrency` limita
+    cuántos lotes se envían a la vez a este proveedor.
+    """
+
+    name = 'base'
+    max_concurrency = 4
+
+    def send_batch(self, messages):
+        raise NotImplementedError
+
+class ConsoleSmsProvider(SmsProvider):
+    """Escribe los mensajes en la salida estándar (desarrollo)"""
+
+    name = 'console'
+
+    def send_batch(self, messages):
+        for message in messages:
+            print(f'SMS para {message.phone_number}: {message.body}')
+        return []
+
+class FileSmsProvider(SmsProvider):
+    """Añade cada mensaje como una línea JSON a un fichero (pruebas locales)"""
+
+    name = 'file'
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages):
+        lines = ''.join(json.dumps(message.to_dict()) + '\n' for message in messages)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as sink:
+            sink.write(lines)
+        return []
+
+class SmsDispatcher:
+    """Cola de salida de SMS drenada por un pool de hilos en lotes.
+
+    Las peticiones solo encolan; los workers agrupan hasta `batch_size`
+    mensajes (esperando como mucho `batch_wait` segundos), los envían
+    respetando la concurrencia del proveedor y reintentan los fallos con
+    espera exponencial.
+    """
+
+    def __init__(self, provider, workers=2, batch_size=50, batch_wait=0.05,
+                 max_retries=3, backoff=0.5, max_queue=10000, logger=None):
+        self.provider = provider
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.logger = logger
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._slots = threading.BoundedSemaphore(provider.max_concurrency)
+        self._stop = threading.Event()
+        self._threads = []
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._sent = 0
+        self._failed = 0
+        self._retried = 0
+        self._dropped = 0
+        self._batches = 0
+        self._send_seconds_total = 0.0
+        self._send_seconds_max = 0.0
+
+    def start(self):
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'sms-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def enqueue(self, phone_number, body):
+        """Encola un SMS sin bloquear; devuelve False si la cola está llena"""
+        if not self._threads:
+            self.start()
+        try:
+            self._queue.put_nowait(OutboundSms(phone_number, body))
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self._dropped += 1
+            return False
+
+    def shutdown(self, timeout=5.0):
+        """Espera a que se vacíe la cola y detiene los workers"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self._deliver(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _deliver(self, batch):
+        pending = batch
+        while pending:
+            for message in pending:
+                message.attempts += 1
+            try:
+                with self._slots:
+                    failed = list(self.provider.send_batch(pending))
+            except Exception:
+                if self.logger:
+                    self.logger.exception('Error al enviar lote de SMS')
+                failed = pending
+
+            failed_ids = {id(message) for message in failed}
+            self._record_sent([m for m in pending if id(m) not in failed_ids])
+
+            retry = [m for m in failed if m.attempts <= self.max_retries]
+            with self._stats_lock:
+                self._failed += len(failed) - len(retry)
+                self._retried += len(retry)
+            if retry and self._stop.wait(self.backoff * 2 ** (retry[0].attempts - 1)):
+                with self._stats_lock:
+                    self._failed += len(retry)
+                return
+            pending = retry
+
+    def _record_sent(self, messages):
+        now = time.monotonic()
+        with self._stats_lock:
+            self._batches += 1
+            for message in messages:
+                elapsed = now - message.enqueued_at
+                self._sent += 1
+                self._send_seconds_total += elapsed
+                if elapsed > self._send_seconds_max:
+                    self._send_seconds_max = elapsed
+
+    def stats(self):
+        """Métricas de la cola: profundidad, enviados, fallidos y tiempo hasta el envío"""
+        with self._stats_lock:
+            return {
+                'provider': self.provider.name,
+                'queue_depth': self._queue.qsize(),
+                'sent': self._sent,
+                'failed': self._failed,
+                'retried': self._retried,
+                'dropped': self._dropped,
+                'batches': self._batches,
+                'time_to_send_seconds_total': self._send_seconds_total,
+                'time_to_send_seconds_max': self._send_seconds_max,
+                'time_to_send_seconds_avg': self._send_seconds_total / self._sent if self._sent else 0.0
+            }
+
+def init_sms_dispatcher(app):
+    """Crea el dispatcher con el proveedor configurado en SMS_PROVIDER ('console' o 'file')"""
+    provider_name = app.config.get('SMS_PROVIDER', 'console')
+    if provider_name == 'console':
+        provider = ConsoleSmsProvider()
+    elif provider_name == 'file':
+        provider = FileSmsProvider(app.config.get('SMS_SINK_PATH', 'sms_outbox.jsonl'))
+    else:
+        raise ValueError(f'SMS_PROVIDER desconocido: {provider_name}')
+
+    provider.max_concurrency = app.config.get('SMS_PROVIDER_CONCURRENCY', provider.max_concurrency)
+
+    dispatcher = SmsDispatcher(
+        provider,
+        workers=app.config.get('SMS_WORKERS', 2),
+        batch_size=app.config.get('SMS_BATCH_SIZE', 50),
+        batch_wait=app.config.get('SMS_BATCH_WAIT', 0.05),
+        max_retries=app.config.get('SMS_MAX_RETRIES', 3),
+        backoff=app.config.get('SMS_RETRY_BACKOFF', 0.5),
+        max_queue=app.config.get('SMS_QUEUE_SIZE', 10000),
+        logger=app.logger
+    )
+    app.extensions['sms_dispatcher'] = dispatcher
+    atexit.register(dispatcher.shutdown)
+    return dispatcher
+
+def get_sms_dispatcher():
+    """Devuelve el dispatcher de SMS de la aplicación actual"""
+    return current_app.extensions['sms_dispatcher']
@@ -0,0 +1,177 @@
+from flask import Response, current_app, request, send_file
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Nombres con hash de contenido (app.3f2a9c1b.js) se sirven como inmutables
+HASHED_NAME = re.compile(r'[.-][0-9a-f]{8,}\.[A-Za-z0-9]+$')
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/javascript',
+    'application/json',
+    'application/xml',
+    'image/svg+xml',
+    'image/x-icon',
+    'image/vnd.microsoft.icon',
+)
+
+PRECOMPRESSED_SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+class StaticAsset:
+    """Fichero estático con su hash, tamaño y variantes comprimidas.
+
+    Los ficheros pequeños se guardan en memoria (`body` y `variants` con los
+    bytes); los grandes se sirven desde disco (`variants` con las rutas de
+    los .gz/.br generados por `flask build-static`).
+    """
+
+    __slots__ = ('path', 'filename', 'content_type', 'digest', 'size',
+                 'immutable', 'body', 'variants')
+
+    def __init__(self, path, filename, content_type, digest, size, immutable, body=None, variants=None):
+        self.path = path
+        self.filename = filename
+        self.content_type = content_type
+        self.digest = digest
+        self.size = size
+        self.immutable = immutable
+        self.body = body
+        self.variants = variants or {}
+
+    def etag(self, encoding=None):
+        return f'{self.digest}-{encoding}' if encoding else self.digest
+
+def is_compressible(content_type):
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+def compress(data, encoding):
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def iter_static_files(static_folder):
+    """Recorre la carpeta estática ignorando las variantes .gz/.br ya generadas"""
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            if name.endswith(tuple(PRECOMPRESSED_SUFFIXES.values())):
+                continue
+            filename = os.path.join(root, name)
+            yield os.path.relpath(filename, static_folder).replace(os.sep, '/'), filename
+
+def load_asset(path, filename, max_inline, min_compress=256):
+    with open(filename, 'rb') as source:
+        data = source.read()
+
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    asset = StaticAsset(
+        path=path,
+        filename=filename,
+        content_type=content_type,
+        digest=hashlib.sha256(data).hexdigest()[:32],
+        size=len(data),
+        immutable=HASHED_NAME.search(path) is not None
+    )
+
+    inline = len(data) <= max_inline
+    if inline:
+        asset.body = data
+
+    if is_compressible(content_type) and len(data) >= min_compress:
+        for encoding in available_encodings():
+            sibling = filename + PRECOMPRESSED_SUFFIXES[encoding]
+            if inline:
+                compressed = compress(data, encoding)
+                if len(compressed) < len(data):
+                    asset.variants[encoding] = compressed
+            elif os.path.exists(sibling):
+                asset.variants[encoding] = sibling
+    return asset
+
+def build_manifest(static_folder, max_inline=256 * 1024):
+    """Lee una vez todos los ficheros estáticos: hash, tamaño y variantes comprimidas"""
+    if not static_folder or not os.path.isdir(static_folder):
+        return {}
+    return {
+        path: load_asset(path, filename, max_inline)
+        for path, filename in iter_static_files(static_folder)
+    }
+
+def write_precompressed(static_folder, min_compress=256):
+    """Genera los .gz (y .br si hay brotli) junto a cada fichero comprimible"""
+    written = 0
+    for path, filename in iter_static_files(static_folder):
+        content_type = mimetypes.guess_type(filename)[0] or ''
+        if not is_compressible(content_type):
+            continue
+        with open(filename, 'rb') as source:
+            data = source.read()
+        if len(data) < min_compress:
+            continue
+        for encoding in available_encodings():
+            compressed = compress(data, encoding)
+            if len(compressed) < len(data):
+                with open(filename + PRECOMPRESSED_SUFFIXES[encoding], 'wb') as target:
+                    target.write(compressed)
+                written += 1
+    return written
+
+def choose_encoding(asset):
+    """Elige la mejor variante aceptada por el cliente (br > gzip > identidad)"""
+    for encoding in ('br', 'gzip'):
+        if encoding in asset.variants and request.accept_encodings[encoding]:
+            return encoding
+    return None
+
+def asset_response(asset):
+    """Respuesta con ETag fuerte por variante, 304 condicional y Cache-Control"""
+    encoding = choose_encoding(asset)
+    etag = asset.etag(encoding)
+
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    elif encoding is None and asset.body is None:
+        response = send_file(asset.filename, mimetype=asset.content_type, etag=False, conditional=False)
+    elif encoding is None:
+        response = Response(asset.body, mimetype=asset.content_type)
+    elif isinstance(asset.variants[encoding], bytes):
+        response = Response(asset.variants[encoding], mimetype=asset.content_type)
+    else:
+        response = send_file(asset.variants[encoding], mimetype=asset.content_type, etag=False, conditional=False)
+
+    if encoding is not None and response.status_code == 200:
+        response.headers['Content-Encoding'] = encoding
+    if asset.variants:
+        response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = (
+        IMMUTABLE_CACHE_CONTROL if asset.immutable else REVALIDATE_CACHE_CONTROL
+    )
+    return response
+
+def init_static_assets(app):
+    """Construye el manifiesto de la carpeta estática al arrancar"""
+    manifest = build_manifest(
+        app.static_folder,
+        max_inline=app.config.get('STATIC_MAX_INLINE_BYTES', 256 * 1024)
+    )
+    app.extensions['static_assets'] = manifest
+    return manifest
+
+def get_static_assets():
+    """Devuelve el manifiesto de ficheros estáticos de la aplicación actual"""
+    return current_app.extensions['static_assets']
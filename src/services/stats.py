@@ -0,0 +1,142 @@
+from sqlalchemy import delete, func, insert, select, update
+from src.models.user import CreatorStats, DailyStats, Invitation, User, VerificationCode, db
+from src.services.bulk import chunked, dialect_insert
+from datetime import date, timedelta
+
+DAILY_COUNTERS = ('invitations_issued', 'invitations_used', 'codes_sent', 'codes_verified', 'signups')
+
+def increment(model, key, **amounts):
+    """Suma `amounts` a los contadores de la fila `key`, creándola si no existe; no hace commit.
+
+    La suma la hace la base de datos en un único INSERT ... ON CONFLICT DO
+    UPDATE, de modo que las transacciones concurrentes no pierden incrementos.
+    """
+    stmt = dialect_insert(model)
+    if stmt is not None:
+        db.session.execute(
+            stmt.values(**key, **amounts).on_conflict_do_update(
+                index_elements=list(key),
+                set_={name: getattr(model, name) + stmt.excluded[name] for name in amounts}
+            )
+        )
+        return
+
+    result = db.session.execute(
+        update(model)
+        .where(*[getattr(model, name) == value for name, value in key.items()])
+        .values({name: getattr(model, name) + value for name, value in amounts.items()})
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.session.execute(insert(model).values(**key, **amounts))
+
+def record_codes_sent(now, count=1):
+    increment(DailyStats, {'day': now.date()}, codes_sent=count)
+
+def record_invitations_issued(created_by, count, now):
+    if not count:
+        return
+    increment(DailyStats, {'day': now.date()}, invitations_issued=count)
+    increment(CreatorStats, {'user_id': created_by}, invitations_issued=count)
+
+def record_signup(created_by, invited_at, now):
+    """Cuenta un alta completada con una invitación de `created_by` emitida en `invited_at`"""
+    increment(DailyStats, {'day': now.date()}, signups=1, codes_verified=1, invitations_used=1)
+    elapsed = (now - invited_at).total_seconds() if invited_at else 0.0
+    increment(CreatorStats, {'user_id': created_by}, invitations_used=1, time_to_use_seconds=max(elapsed, 0.0))
+
+def daily_stats(since, until):
+    """Filas diarias entre `since` y `until` (fechas incluidas), con ceros en los días sin actividad"""
+    rows = {
+        row.day: row
+        for row in DailyStats.query.filter(DailyStats.day >= since, DailyStats.day <= until)
+    }
+    days = []
+    day = since
+    while day <= until:
+        row = rows.get(day)
+        days.append(row.to_dict() if row else dict(
+            {'day': day.isoformat()}, **{name: 0 for name in DAILY_COUNTERS}
+        ))
+        day += timedelta(days=1)
+    return days
+
+def funnel(days):
+    """Totales del periodo y tasas de conversión del embudo"""
+    totals = {name: sum(day[name] for day in days) for name in DAILY_COUNTERS}
+    totals['verification_rate'] = (
+        round(totals['codes_verified'] / totals['codes_sent'], 4) if totals['codes_sent'] else None
+    )
+    totals['invitation_use_rate'] = (
+        round(totals['invitations_used'] / totals['invitations_issued'], 4) if totals['invitations_issued'] else None
+    )
+    return totals
+
+def top_creators(limit):
+    """Usuarios que más altas han conseguido con sus invitaciones"""
+    rows = db.session.execute(
+        select(CreatorStats, User.phone_number)
+        .join(User, User.id == CreatorStats.user_id)
+        .order_by(CreatorStats.invitations_used.desc(), CreatorStats.user_id)
+        .limit(limit)
+    )
+    return [dict(stats.to_dict(), phone_number=phone_number) for stats, phone_number in rows]
+
+def _as_date(value):
+    # func.date() devuelve un texto 'YYYY-MM-DD' en SQLite y un date en PostgreSQL
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+def _count_by_day(column, *conditions):
+    day = func.date(column)
+    return {
+        _as_date(value): count
+        for value, count in db.session.execute(
+            select(day, func.count()).where(column.isnot(None), *conditions).group_by(day)
+        )
+    }
+
+def backfill_stats(batch_size=5000):
+    """Recalcula las tablas de estadísticas desde las tablas base y hace commit.
+
+    Los códigos de verificación usados o caducados se borran, así que
+    `codes_sent` solo cuenta los que siguen en la tabla y `codes_verified`
+    se reconstruye a partir de las altas. Devuelve (días, creadores).
+    """
+    db.session.execute(delete(DailyStats))
+    db.session.execute(delete(CreatorStats))
+
+    counters = {
+        'invitations_issued': _count_by_day(Invitation.created_at),
+        'invitations_used': _count_by_day(Invitation.used_at, Invitation.used_by.isnot(None)),
+        'codes_sent': _count_by_day(VerificationCode.created_at),
+        'signups': _count_by_day(User.created_at, User.invited_by.isnot(None))
+    }
+    counters['codes_verified'] = counters['signups']
+
+    days = {}
+    for name, by_day in counters.items():
+        for day, count in by_day.items():
+            days.setdefault(day, {'day': day, **{counter: 0 for counter in DAILY_COUNTERS}})[name] = count
+
+    # El tiempo hasta el uso se suma en Python recorriendo las invitaciones por lotes
+    creators = {}
+    result = db.session.execute(
+        select(Invitation.created_by, Invitation.created_at, Invitation.used_by, Invitation.used_at)
+        .execution_options(yield_per=batch_size)
+    )
+    for created_by, created_at, used_by, used_at in result:
+        row = creators.setdefault(created_by, {
+            'user_id': created_by, 'invitations_issued': 0, 'invitations_used': 0, 'time_to_use_seconds': 0.0
+        })
+        row['invitations_issued'] += 1
+        if used_by is not None:
+            row['invitations_used'] += 1
+            if created_at and used_at:
+                row['time_to_use_seconds'] += max((used_at - created_at).total_seconds(), 0.0)
+
+    for model, rows in ((DailyStats, days.values()), (CreatorStats, creators.values())):
+        for chunk in chunked(rows, batch_size):
+            db.session.execute(insert(model), chunk)
+
+    db.session.commit()
+    return len(days), len(creators)
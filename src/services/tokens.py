@@ -0,0 +1,156 @@
+from flask import current_app, g, jsonify, request
+from functools import wraps
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from sqlalchemy import select, update
+from src.models.user import User, db
+from src.services.invitation_cache import TTLCache
+import secrets
+
+class InvalidToken(Exception):
+    """Token ausente, mal firmado, caducado o revocado"""
+
+class TokenService:
+    """Emite y verifica tokens firmados con SECRET_KEY (itsdangerous).
+
+    Los tokens llevan el id del usuario, si es admin y su versión de tokens
+    (`users.token_version`); revocar incrementa la versión en la base de
+    datos. El token de refresco y la emisión comparan siempre con la versión
+    de la base de datos; el de acceso, con la versión cacheada, así que en los
+    demás workers la revocación tarda como mucho `cache_ttl` segundos en
+    aplicarse a los tokens de acceso.
+    """
+
+    def __init__(self, secret_key, access_ttl=900, refresh_ttl=30 * 86400,
+                 cache_size=10000, cache_ttl=60):
+        self.access_ttl = access_ttl
+        self.refresh_ttl = refresh_ttl
+        self._access = URLSafeTimedSerializer(secret_key, salt='access-token')
+        self._refresh = URLSafeTimedSerializer(secret_key, salt='refresh-token')
+        self.versions = TTLCache(cache_size, cache_ttl)
+        self.users = TTLCache(cache_size, cache_ttl)
+
+    def version(self, user_id, fresh=False):
+        """Versión de tokens del usuario (None si no existe); con fresh=True no usa la caché"""
+        if not fresh:
+            cached = self.versions.get(user_id)
+            if cached is not None:
+                return cached
+        version = db.session.execute(
+            select(User.token_version).where(User.id == user_id)
+        ).scalar()
+        if version is not None:
+            self.versions.set(user_id, version)
+        return version
+
+    def revoke(self, user_id):
+        """Invalida todos los tokens emitidos hasta ahora para el usuario; no hace commit"""
+        db.session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(token_version=User.token_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        self.versions.pop(user_id)
+        self.users.pop(user_id)
+
+    def issue(self, user):
+        """Devuelve un par de tokens para un usuario (dict de User.to_dict())"""
+        claims = {
+            'uid': user['id'],
+            'adm': bool(user['is_admin']),
+            'ver': self.version(user['id'], fresh=True)
+        }
+        return {
+            'access_token': self._access.dumps(claims),
+            'refresh_token': self._refresh.dumps({'uid': user['id'], 'ver': claims['ver']}),
+            'token_type': 'Bearer',
+            'expires_in': self.access_ttl
+        }
+
+    def _load(self, serializer, token, max_age, fresh=False):
+        try:
+            claims = serializer.loads(token, max_age=max_age)
+        except SignatureExpired:
+            raise InvalidToken('Token caducado')
+        except BadSignature:
+            raise InvalidToken('Token inválido')
+        version = self.version(claims.get('uid'), fresh=fresh)
+        if version is not None and claims.get('ver', 0) > version:
+            # Emitido tras una revocación que la caché de este worker aún no ha visto
+            version = self.version(claims.get('uid'), fresh=True)
+        if version is None or claims.get('ver') != version:
+            raise InvalidToken('Token revocado')
+        return claims
+
+    def verify_access(self, token):
+        return self._load(self._access, token, self.access_ttl)
+
+    def verify_refresh(self, token):
+        return self._load(self._refresh, token, self.refresh_ttl, fresh=True)
+
+    def get_user(self, user_id):
+        """Devuelve User.to_dict() desde la caché, consultando la base de datos si falta"""
+        record = self.users.get(user_id)
+        if record is None:
+            user = db.session.execute(select(User).where(User.id == user_id)).scalar()
+            if user is None:
+                return None
+            record = user.to_dict()
+            self.users.set(user_id, record)
+        return record
+
+def init_token_service(app):
+    """Crea el servicio de tokens con SECRET_KEY y la configuración *_TOKEN_TTL.
+
+    Sin SECRET_KEY la aplicación no arranca: cualquiera podría firmar un token
+    de administrador con una clave conocida. En DEBUG/TESTING se usa una clave
+    aleatoria que no sobrevive al reinicio.
+    """
+    if not app.config.get('SECRET_KEY'):
+        if not (app.debug or app.testing):
+            raise RuntimeError('SECRET_KEY no configurada: defínela en el entorno para firmar los tokens')
+        app.config['SECRET_KEY'] = secrets.token_hex(32)
+        app.logger.warning('SECRET_KEY no configurada; se usa una clave aleatoria temporal')
+
+    service = TokenService(
+        app.config['SECRET_KEY'],
+        access_ttl=app.config.get('ACCESS_TOKEN_TTL', 900),
+        refresh_ttl=app.config.get('REFRESH_TOKEN_TTL', 30 * 86400),
+        cache_size=app.config.get('USER_CACHE_SIZE', 10000),
+        cache_ttl=app.config.get('USER_CACHE_TTL', 60)
+    )
+    app.extensions['token_service'] = service
+    return service
+
+def get_token_service():
+    """Devuelve el servicio de tokens de la aplicación actual"""
+    return current_app.extensions['token_service']
+
+def require_auth(admin=False):
+    """Exige un token de acceso válido en `Authorization: Bearer <token>`.
+
+    Deja los datos del token en `g.auth` ({'user_id', 'is_admin'}) sin
+    consultar la base de datos. Con admin=True solo admite administradores.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            header = request.headers.get('Authorization', '')
+            scheme, _, token = header.partition(' ')
+            if scheme.lower() != 'bearer' or not token:
+                return jsonify({'error': 'Autenticación requerida'}), 401
+            try:
+                claims = get_token_service().verify_access(token.strip())
+            except InvalidToken as e:
+                return jsonify({'error': str(e)}), 401
+
+            g.auth = {'user_id': claims['uid'], 'is_admin': claims['adm']}
+            if admin and not claims['adm']:
+                return jsonify({'error': 'Permisos insuficientes'}), 403
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def is_self_or_admin(user_id):
+    """Indica si el usuario autenticado es `user_id` o un administrador"""
+    return g.auth['is_admin'] or g.auth['user_id'] == user_id
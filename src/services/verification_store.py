@@ -0,0 +1,203 @@
+from flask import current_app
+from sqlalchemy import delete, select, update
+from src.models.user import VerificationCode, db
+from datetime import datetime
+import threading
+import zlib
+
+VERIFICATION_OK = 'ok'
+VERIFICATION_EXPIRED = 'expired'
+VERIFICATION_INVALID = 'invalid'
+
+class VerificationStore:
+    """Almacén de códigos de verificación con caducidad.
+
+    `issue` sustituye cualquier código anterior del teléfono, `consume` marca el
+    código como usado de forma atómica y `sweep` elimina los códigos caducados.
+    Si la transacción del alta se deshace tras un `consume` correcto, `restore`
+    vuelve a dejar el código disponible.
+    """
+
+    def issue(self, phone_number, code, expires_at):
+        raise NotImplementedError
+
+    def consume(self, phone_number, code, now=None):
+        raise NotImplementedError
+
+    def restore(self, phone_number, code):
+        raise NotImplementedError
+
+    def sweep(self, now=None):
+        raise NotImplementedError
+
+class SqlVerificationStore(VerificationStore):
+    """Guarda los códigos en `verification_codes` dentro de la transacción en curso"""
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+
+    def issue(self, phone_number, code, expires_at):
+        # Eliminar códigos anteriores para este número
+        db.session.execute(
+            delete(VerificationCode)
+            .where(VerificationCode.phone_number == phone_number)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.add(VerificationCode(
+            phone_number=phone_number,
+            code=code,
+            expires_at=expires_at
+        ))
+
+    def consume(self, phone_number, code, now=None):
+        now = now or datetime.utcnow()
+        # UPDATE condicional: si dos peticiones compiten por el mismo código
+        # solo una afecta a la fila
+        result = db.session.execute(
+            update(VerificationCode)
+            .where(
+                VerificationCode.phone_number == phone_number,
+                VerificationCode.code == code,
+                VerificationCode.is_used == False,
+                VerificationCode.expires_at >= now
+            )
+            .values(is_used=True)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount > 0:
+            return VERIFICATION_OK
+
+        # Distinguir un código caducado de uno inexistente (solo en la ruta de error)
+        expired = db.session.execute(
+            select(VerificationCode.id).where(
+                VerificationCode.phone_number == phone_number,
+                VerificationCode.code == code,
+                VerificationCode.is_used == False,
+                VerificationCode.expires_at < now
+            ).limit(1)
+        ).first()
+        return VERIFICATION_EXPIRED if expired else VERIFICATION_INVALID
+
+    def restore(self, phone_number, code):
+        # El UPDATE de `consume` forma parte de la transacción: el rollback ya lo deshace
+        pass
+
+    def sweep(self, now=None):
+        """Borra en lotes los códigos caducados o usados y devuelve cuántos eliminó"""
+        now = now or datetime.utcnow()
+        removed = 0
+        while True:
+            batch = (
+                select(VerificationCode.id)
+                .where((VerificationCode.expires_at < now) | (VerificationCode.is_used == True))
+                .limit(self.batch_size)
+                .scalar_subquery()
+            )
+            deleted = db.session.execute(
+                delete(VerificationCode)
+                .where(VerificationCode.id.in_(batch))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            removed += deleted
+            if deleted < self.batch_size:
+                return removed
+
+class MemoryVerificationStore(VerificationStore):
+    """Diccionario en memoria del proceso repartido en shards con un lock cada uno.
+
+    Los códigos caducados se eliminan al consultarlos y en cada `sweep`. Los
+    consumidos se guardan aparte hasta que caducan para que `restore` pueda
+    devolverlos si el alta falla (este almacén no participa en la transacción
+    SQL). Solo
+    es válido con un único proceso; con varios workers hace falta un almacén
+    compartido (p. ej. Redis) que implemente la misma interfaz.
+    """
+
+    def __init__(self, shards=16):
+        self._shards = [(threading.Lock(), {}, {}) for _ in range(shards)]
+
+    def _shard(self, phone_number):
+        return self._shards[zlib.crc32(phone_number.encode()) % len(self._shards)]
+
+    def issue(self, phone_number, code, expires_at):
+        lock, codes, consumed = self._shard(phone_number)
+        with lock:
+            codes[phone_number] = (code, expires_at)
+            consumed.pop(phone_number, None)
+
+    def consume(self, phone_number, code, now=None):
+        now = now or datetime.utcnow()
+        lock, codes, consumed = self._shard(phone_number)
+        with lock:
+            entry = codes.get(phone_number)
+            if entry is None or entry[0] != code:
+                if entry is not None and entry[1] < now:
+                    del codes[phone_number]
+                return VERIFICATION_INVALID
+            del codes[phone_number]
+            if entry[1] < now:
+                return VERIFICATION_EXPIRED
+            consumed[phone_number] = entry
+        return VERIFICATION_OK
+
+    def restore(self, phone_number, code):
+        lock, codes, consumed = self._shard(phone_number)
+        with lock:
+            entry = consumed.get(phone_number)
+            # Solo si no se ha emitido otro código para el teléfono entretanto
+            if entry is not None and entry[0] == code and phone_number not in codes:
+                codes[phone_number] = consumed.pop(phone_number)
+
+    def sweep(self, now=None):
+        now = now or datetime.utcnow()
+        removed = 0
+        for lock, codes, consumed in self._shards:
+            with lock:
+                expired = [phone for phone, (_, expires_at) in codes.items() if expires_at < now]
+                for phone in expired:
+                    del codes[phone]
+                for phone in [phone for phone, (_, expires_at) in consumed.items() if expires_at < now]:
+                    del consumed[phone]
+            removed += len(expired)
+        return removed
+
+    def __len__(self):
+        return sum(len(codes) for _, codes, _ in self._shards)
+
+def start_sweeper(app, store, interval):
+    """Lanza un hilo demonio que ejecuta `store.sweep()` cada `interval` segundos"""
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                with app.app_context():
+                    store.sweep()
+            except Exception:
+                app.logger.exception('Error al purgar códigos de verificación')
+
+    thread = threading.Thread(target=run, name='verification-sweeper', daemon=True)
+    thread.start()
+    return stop
+
+def init_verification_store(app):
+    """Crea el almacén configurado en VERIFICATION_STORE ('sql' o 'memory')"""
+    backend = app.config.get('VERIFICATION_STORE', 'sql')
+    if backend == 'memory':
+        store = MemoryVerificationStore(shards=app.config.get('VERIFICATION_STORE_SHARDS', 16))
+    elif backend == 'sql':
+        store = SqlVerificationStore(batch_size=app.config.get('VERIFICATION_SWEEP_BATCH', 1000))
+    else:
+        raise ValueError(f'VERIFICATION_STORE desconocido: {backend}')
+
+    app.extensions['verification_store'] = store
+
+    interval = app.config.get('VERIFICATION_SWEEP_INTERVAL', 0)
+    if interval:
+        start_sweeper(app, store, interval)
+    return store
+
+def get_verification_store():
+    """Devuelve el almacén de códigos de la aplicación actual"""
+    return current_app.extensions['verification_store']